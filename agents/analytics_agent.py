@@ -1,33 +1,27 @@
 import traceback
-from config import OUT_DIR, EMAIL_FROM, EMAIL_TO, SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS
 from config import DATA_DIR
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import smtplib
+from mailer import send_email
 
-def send_email(subject, body_text):
-    # same as prior; factor into a shared utility if you want
-    msg = MIMEMultipart()
-    msg["From"] = EMAIL_FROM
-    msg["To"] = ",".join(EMAIL_TO)
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body_text, "plain"))
-    s = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-    s.starttls()
-    s.login(SMTP_USER, SMTP_PASS)
-    s.sendmail(EMAIL_FROM, EMAIL_TO, msg.as_string())
-    s.quit()
-
-def run_analytics_and_notify():
+def run_analytics_and_notify(frames=None):
+    """
+    frames: optional {source file name: typed frame} from
+    run_data_quality(keep_frames=True); those files are not read again.
+    """
     try:
         # import your run_analytics function (it reads CSVs from DATA_ANALYTICS)
-        from app_core.analytics import run_analytics
-        results = run_analytics()
+        from app_core.analytics import run_analytics, raw_from_files, AS_OF_LATEST
+        # window ends at the newest trade in the data, so it moves on each week
+        results = run_analytics(as_of=AS_OF_LATEST, raw=raw_from_files(frames) if frames else None)
         # quick validation
-        if "subproduct_metrics" not in results:
-            raise RuntimeError("run_analytics did not return subproduct_metrics")
+        if "metrics_cube" not in results:
+            raise RuntimeError("run_analytics did not return metrics_cube")
         # send success email
         body = "Analytics completed successfully.\n\nKeys returned:\n" + "\n".join(results.keys())
+        failures = results.get("date_parse_failures") or {}
+        if failures:
+            body += "\n\nDate values that failed to parse (set to empty):\n"
+            for fname, cols in failures.items():
+                body += f"{fname}: " + ", ".join(f"{c}={n}" for c, n in cols.items()) + "\n"
         send_email("Weekly Report - Analytics Completed", body)
         return results
     except Exception as e:
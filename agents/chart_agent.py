@@ -1,54 +1,51 @@
 import os
-import numpy as np
 import matplotlib
 matplotlib.use("Agg")
-from config import OUT_DIR, EMAIL_FROM, EMAIL_TO, SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
-import smtplib
+from config import OUT_DIR
+from config import LLM_WORKER_URL, LLM_WORKER_TIMEOUT, CHART_WORKERS
+from config import LLM_CACHE_DIR, LLM_CACHE_MAX_AGE_DAYS, LLM_CACHE_MAX_MB
 from typing import Dict
-from pathlib import Path
 
 # LLM: use LangChain wrapper. Example using a generic LLM interface placeholder.
 # Replace this with your LangChain/Gemma client setup.
 #from langchain import LLMChain, PromptTemplate
 from langchain_core.prompts import PromptTemplate
+from prompts import INTERPRETATION_TEMPLATE, CHART_ITEMS
+from metric_digest import build_digest, prompt_inputs, mover_sentence, templated_sentences
+from interpretation_cache import InterpretationCache, cache_key
+from mailer import send_email
 #from langchain.chains.llm import LLMChain
-from langchain_community.llms import HuggingFacePipeline
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
-from gemma_llm import create_gemma_llm
 #from langchain.llms import OpenAI  # replace with your Gemma wrapper if available
 
-def send_email_with_images(subject, body_text, image_paths):
-    msg = MIMEMultipart()
-    msg["From"] = EMAIL_FROM
-    msg["To"] = ",".join(EMAIL_TO)
-    msg["Subject"] = subject
-    # text first (URL message)
-    msg.attach(MIMEText(body_text, "plain"))
-    # attach images in order
-    for p in image_paths:
-        with open(p, "rb") as f:
-            img = MIMEImage(f.read())
-            img.add_header("Content-Disposition", "attachment", filename=Path(p).name)
-            msg.attach(img)
-    s = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-    s.starttls()
-    s.login(SMTP_USER, SMTP_PASS)
-    s.sendmail(EMAIL_FROM, EMAIL_TO, msg.as_string())
-    s.quit()
-
-def classify_change(pct_change: float) -> str:
-    """Return High/Medium/Low rule-based classification"""
-    if np.isnan(pct_change):
-        return "No change"
-    a = abs(pct_change)
-    if a >= 50:
-        return "High"
-    if a >= 15:
-        return "Medium"
-    return "Low"
+FALLBACK_INSIGHT = "Insight could not be generated this week."
+
+def llm_signature():
+    """
+    Identifies the model that would answer (id, precision, max_new_tokens),
+    without loading it: the worker reports its own on /health. None when the
+    worker is configured but fails its health check.
+    """
+    if LLM_WORKER_URL:
+        from llm_worker import worker_info
+        info = worker_info(LLM_WORKER_URL)
+        if info is None:
+            print(f"LLM worker at {LLM_WORKER_URL} failed its health check; using fallback insights")
+            return None
+        return info.get("model", "unknown")
+    from gemma_llm import model_signature
+    return model_signature()
+
+def interpretation_llm():
+    """
+    LLM used for the chart interpretations: the resident worker at
+    LLM_WORKER_URL when configured (no model load in this process), else
+    Gemma loaded in-process.
+    """
+    if LLM_WORKER_URL:
+        from llm_worker import RemoteLLM
+        return RemoteLLM(url=LLM_WORKER_URL, timeout=LLM_WORKER_TIMEOUT)
+    from gemma_llm import create_gemma_llm
+    return create_gemma_llm()
 
 def clean_llm_output(text: str) -> str:
     if not text:
@@ -75,77 +72,55 @@ def clean_llm_output(text: str) -> str:
 
 
 def run_charts_and_interpret(results: Dict):
-    # results from analytics_agent (contains subproduct_metrics and perhaps deals_4w)
-    subproduct_metrics = results["subproduct_metrics"]
-    deals_4w = results["deals_4w"]
-    df_margincalls = results["df_margincalls"]
-    # build each chart by calling your chart functions and saving as PNG
-    # Example for chart1
-    from app_core.charts.num_deals_chart import plot_deal_volumes
-    from app_core.charts.val_deals_chart import plot_deal_value
-    from app_core.charts.trade_cap_stp_chart import plot_trade_cap_stp
-    from app_core.charts.settlement_stp_chart import plot_settlement_stp
-    from app_core.charts.unconfirmed_deals_chart import plot_deals_unconfirmed
-    from app_core.charts.unsettled_deals_chart import plot_deals_unsettled
-    from app_core.charts.disputed_margin_calls_chart import plot_disputed_margin_calls
-
-
-    images = []
-    # call each plot and save
-    fig1 = plot_deal_volumes(subproduct_metrics)
-    p1 = OUT_DIR / "chart1_volumes.png"; fig1.savefig(p1, bbox_inches="tight"); images.append(str(p1))
-    fig2 = plot_deal_value(subproduct_metrics)
-    p2 = OUT_DIR / "chart2_values.png"; fig2.savefig(p2, bbox_inches="tight"); images.append(str(p2))
-    fig3 = plot_trade_cap_stp(subproduct_metrics)
-    p3 = OUT_DIR / "chart3_tradecap.png"; fig3.savefig(p3, bbox_inches="tight"); images.append(str(p3))
-    fig4 = plot_settlement_stp(subproduct_metrics, deals_4w=deals_4w)
-    p4 = OUT_DIR / "chart4_settlement.png"; fig4.savefig(p4, bbox_inches="tight"); images.append(str(p4))
-    fig5 = plot_deals_unconfirmed(subproduct_metrics)
-    p5 = OUT_DIR / "chart5_breaks_counts.png"; fig5.savefig(p5, bbox_inches="tight"); images.append(str(p5))
-    fig6 = plot_deals_unsettled(subproduct_metrics)
-    p6 = OUT_DIR / "chart6_breaks_amounts.png"; fig6.savefig(p6, bbox_inches="tight"); images.append(str(p6))
-    fig_counts, fig_amounts = plot_disputed_margin_calls(df_margincalls)
-    p7 = OUT_DIR / "chart7_disc_counts.png"; fig_counts.savefig(p7, bbox_inches="tight"); images.append(str(p7))
-    p8 = OUT_DIR / "chart8_disc_amounts.png"; fig_amounts.savefig(p8, bbox_inches="tight"); images.append(str(p8))
-
-    # Interpretation: for each chart compute a key metric (example: % change last two weeks)
-
-    llm = create_gemma_llm()
-
-    prompt = PromptTemplate(
-        input_variables=["chart_name"],
-        template=(
-            "You are an analyst at an investment bank covering equities, bonds, and derivatives.\n"
-            "Summarize the recent weekly change for the metric: {chart_name}.\n"
-            "Write a short executive paragraph (2–3 lines) stating:\n"
-            "- whether it increased or decreased materially\n"
-            "- one likely business reason\n"
-            "- one practical action to take\n"
-            "Respond with only the paragraph."
-        )
-    )
-
-    chain = prompt | llm
+    # results from analytics_agent (contains metrics_cube and perhaps deals_4w)
+    metrics_cube = results["metrics_cube"]
+    # render the eight charts as PNGs in parallel processes (figures closed
+    # after saving); paths come back in chart order
+    from app_core.charts.render import render_charts
+    images = render_charts(results, OUT_DIR, workers=CHART_WORKERS)
+
+    # Interpretation: WoW digest per product group; only charts with High /
+    # Medium movers go to the LLM, Low movers get templated sentences
+    chart_items = CHART_ITEMS
+    digest = build_digest(results)
+    prompts = prompt_inputs(digest)
+
+    # cached texts first: the key is the model, the template and the prompt
+    # inputs, so unchanged weeks and re-runs need no generation at all
+    cache = InterpretationCache(LLM_CACHE_DIR, LLM_CACHE_MAX_AGE_DAYS, int(LLM_CACHE_MAX_MB * 1024 * 1024))
+    signature = llm_signature() if prompts else None
+    keys = {}
+    texts = {}
+    if signature is not None:
+        for name, inputs in prompts.items():
+            keys[name] = cache_key(signature, INTERPRETATION_TEMPLATE, name, inputs)
+            texts[name] = cache.get(keys[name])
+    missing = [name for name in prompts if texts.get(name) is None]
+
+    # one batched call for the prompts not cached (the model is only loaded
+    # when there are any): GEMMA_BATCH_SIZE prompts per padded pass, results
+    # come back in order
+    if signature is not None and missing:
+        prompt = PromptTemplate(input_variables=["chart_name", "period", "movers"], template=INTERPRETATION_TEMPLATE)
+        chain = prompt | interpretation_llm()
+        outputs = chain.batch([prompts[name] for name in missing], return_exceptions=True)
+        for name, out in zip(missing, outputs):
+            if isinstance(out, str):  # exceptions are not cached
+                texts[name] = out.strip()
+                cache.put(keys[name], texts[name], chart=name, model=signature)
+    print(f"Interpretations: {len(prompts)} of {len(chart_items)} charts have High/Medium movers"
+          + (f", {len(prompts) - len(missing)} cached, {len(missing)} generated" if signature is not None else ""))
+    cache.evict()
 
     interpretations = []
-
-    chart_items = [
-        "Deal Volumes",
-        "Deal Values",
-        "Trade Capture STP",
-        "Settlement STP",
-        "Unconfirmed deals (counts)",
-        "Unsettled deals (counts)",
-        "Disputed Marin Calls (counts)",
-        "Disputed Margin Amounts",
-    ]
-
     for name in chart_items:
-        try:
-            llm_text = chain.invoke({"chart_name": name}).strip()
-            interpretations.append((name, llm_text))
-        except Exception:
-            interpretations.append((name, "Insight could not be generated this week."))
+        rows = digest.get(name, [])
+        parts = []
+        if name in prompts:  # grounded fallback when the LLM is unavailable
+            parts.append(texts.get(name) or mover_sentence(name, rows))
+        parts.append(templated_sentences(name, rows))
+        txt = " ".join(p for p in parts if p)
+        interpretations.append((name, txt or FALLBACK_INSIGHT))
 
 
     # Build Weekly highlights text from interpretations (concatenate)
@@ -181,23 +156,15 @@ def run_charts_and_interpret(results: Dict):
     highlights_png = OUT_DIR / "weekly_highlights.png"
     text_to_image(highlights, highlights_png)
 
-    # Create a 'Summary' pic: render the summary DataFrame to image (pandas -> HTML -> image)
-    # A simple approach: convert metrics_df to image using dfi (pandas) or mpl table. Here's a simple matplotlib table:
-    import matplotlib.pyplot as plt
-    sample_product = next(iter(subproduct_metrics.keys()))
-    sample_df = subproduct_metrics[sample_product]
-    fig, ax = plt.subplots(figsize=(8, 6))
-    ax.axis("off")
-    tbl = ax.table(cellText=sample_df.values, colLabels=sample_df.columns, rowLabels=sample_df.index, loc="center")
-    tbl.auto_set_font_size(False)
-    tbl.set_fontsize(10)
-    tbl.scale(1, 1.5)
-    summary_png = OUT_DIR / "summary_table.png"
-    fig.savefig(summary_png, bbox_inches="tight")
-    plt.close(fig)
-
-    # Email order: body (URL), then weekly highlights image, then summary table image
-    send_email_with_images("Weekly Report: Automated", f"Weekly report URL: {web_url}\n\nSee attached images", [str(highlights_png), str(summary_png)])
+    # Summary tables of every product subtype, one PDF page each (rendered
+    # from a shared page template in parallel processes)
+    from app_core.charts.summary_tables import render_summary_pdf
+    summary_pdf = render_summary_pdf(metrics_cube, OUT_DIR / "summary_tables.pdf", workers=CHART_WORKERS,
+                                     freq=results["freq"])
+
+    # Email order: body (URL), then weekly highlights image, then summary tables PDF
+    attachments = [str(highlights_png)] + ([str(summary_pdf)] if summary_pdf else [])
+    send_email("Weekly Report: Automated", f"Weekly report URL: {web_url}\n\nSee attached images and summary tables", attachments)
 
     # return highlights text, images list
     return highlights, images
@@ -3,10 +3,21 @@ import os
 
 ROOT = Path(__file__).resolve().parents[1]  # project root
 #DATA_LANDING = ROOT / "data" / "landing"    # where uploaded CSVs go
-DATA_DIR = ROOT / "data"              # where analytics reads from
+DATA_DIR = Path(os.environ.get("IB_DATA_DIR", ROOT / "data"))  # where analytics reads from
 OUT_DIR = ROOT / "reports"
 OUT_DIR.mkdir(exist_ok=True, parents=True)
 
+# parallel processes for the per-file data quality checks (1 = sequential)
+DQ_WORKERS = int(os.environ.get("DQ_WORKERS", os.cpu_count() or 1))
+# parallel processes rendering the report charts (app_core/charts/render.py)
+CHART_WORKERS = int(os.environ.get("CHART_WORKERS", os.cpu_count() or 1))
+# "overwrite": replace data/*.csv with the accepted rows (default)
+# "quarantine": keep the sources, write data/clean/ (Parquet) + data/quarantine/
+DQ_MODE = os.environ.get("DQ_MODE", "overwrite")
+# "1": also store the validated frames in the parse cache (data/.cache/) so
+# the dashboard does not re-parse the rewritten CSVs (overwrite mode only)
+DQ_SNAPSHOT = os.environ.get("DQ_SNAPSHOT", "0") == "1"
+
 # Email settings (read these from environment or CI secrets)
 EMAIL_FROM = os.environ.get("REPORT_EMAIL_FROM")
 EMAIL_TO = os.environ.get("REPORT_EMAIL_TO", "").split(",")  # comma-separated recipients
@@ -14,8 +25,21 @@ SMTP_HOST = os.environ.get("SMTP_HOST")
 SMTP_PORT = int(os.environ.get("SMTP_PORT"))
 SMTP_USER = os.environ.get("SMTP_USER")
 SMTP_PASS = os.environ.get("SMTP_PASS")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") == "1"  # "0" for a local test server
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", "60"))
+# outbox of agents/mailer.py: queued messages, kept until sent
+OUTBOX_DIR = Path(os.environ.get("OUTBOX_DIR", OUT_DIR / "outbox"))
+MAIL_RETRIES = int(os.environ.get("MAIL_RETRIES", "3"))
+MAIL_RETRY_DELAY = float(os.environ.get("MAIL_RETRY_DELAY", "5"))  # seconds, doubled per retry
 
 STREAMLIT_URL = os.environ.get("STREAMLIT_URL", "https://investmentbankingperfreport.streamlit.app/")
 
 # LLM config (LangChain model key or local runner)
 LLM_TYPE = os.environ.get("LLM_TYPE", "gemma")  # your choice
+# resident model worker (agents/llm_worker.py); empty = load Gemma in-process
+LLM_WORKER_URL = os.environ.get("LLM_WORKER_URL", "")
+LLM_WORKER_TIMEOUT = float(os.environ.get("LLM_WORKER_TIMEOUT", "600"))
+# on-disk cache of chart interpretations (agents/interpretation_cache.py)
+LLM_CACHE_DIR = Path(os.environ.get("LLM_CACHE_DIR", OUT_DIR / "llm_cache"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "90"))
+LLM_CACHE_MAX_MB = float(os.environ.get("LLM_CACHE_MAX_MB", "50"))
@@ -1,10 +1,11 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import smtplib
-from config import DATA_DIR, OUT_DIR, EMAIL_FROM, EMAIL_TO, SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from config import DATA_DIR, OUT_DIR
+from mailer import send_email
 
 # Example: you will supply these
 MANDATORY_FIELDS = {
@@ -36,57 +37,292 @@ NO_NEGATIVE_COLS = {
     "df_dercr.csv":"Notional"
 }
 
-def send_email(subject, body_text):
-    msg = MIMEMultipart()
-    msg["From"] = EMAIL_FROM
-    msg["To"] = ",".join(EMAIL_TO)
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body_text, "plain"))
-    s = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-    s.starttls()
-    s.login(SMTP_USER, SMTP_PASS)
-    s.sendmail(EMAIL_FROM, EMAIL_TO, msg.as_string())
-    s.quit()
-
-def run_data_quality(file_list):
+# rows per chunk when streaming a file through the checks
+DQ_CHUNK_ROWS = 200_000
+# rejected rows kept per file for the e-mail
+MAX_PROBLEM_ROWS = 50
+
+
+def clean_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Standard clean: trim strings. Files are read as text, so every column is
+    a string column and is stripped with one vectorized .str call.
+    """
+    for col in df.columns:
+        if df[col].dtype == object or isinstance(df[col].dtype, pd.StringDtype):
+            df[col] = df[col].str.strip()
+    return df
+
+
+def rule_masks(df: pd.DataFrame, fname: str) -> dict:
+    """Boolean column masks (True = rule broken) for one chunk of `fname`."""
+    mandatory = [c for c in MANDATORY_FIELDS.get(fname, []) if c in df.columns]
+    missing = df[mandatory].isna().any(axis=1) if mandatory else pd.Series(False, index=df.index)
+
+    invalid = pd.Series(False, index=df.index)
+    for col, allowed in VALID_VALUE_RULES.items():
+        if col in df.columns:
+            invalid |= ~df[col].isin(allowed)  # NaN is not an allowed value
+
+    negative = pd.Series(False, index=df.index)
+    amount_col = NO_NEGATIVE_COLS.get(fname)
+    if amount_col in df.columns:
+        negative = pd.to_numeric(df[amount_col], errors="coerce") < 0
+
+    return {"missing": missing, "invalid": invalid, "negative": negative}
+
+
+# rule mask -> reason code written to the quarantine file
+REASON_CODES = {
+    "missing": "MISSING_MANDATORY",
+    "invalid": "INVALID_VALUE",
+    "negative": "NEGATIVE_AMOUNT",
+}
+
+
+def reason_codes(masks: dict) -> pd.Series:
+    """';'-joined reason codes per row ('' for rows that pass)."""
+    reason = None
+    for key, code in REASON_CODES.items():
+        part = masks[key].map({True: code, False: ""})
+        reason = part if reason is None else reason.str.cat(part, sep=";")
+    return reason.str.replace(r";{2,}", ";", regex=True).str.strip(";")
+
+
+def _file_result(finding, accepted=None, problems=None, manifest=None, frame=None) -> dict:
+    return {"finding": finding, "accepted": accepted, "problems": problems,
+            "manifest": manifest, "frame": frame}
+
+
+def _typed_frame(parts: list, fname: str):
+    """Concatenate typed accepted chunks; date parse failures summed over chunks."""
+    from app_core.schema import concat_typed, empty_frame, schema_for
+
+    if not parts:
+        return empty_frame(schema_for(fname))
+    frame = concat_typed(parts) if len(parts) > 1 else parts[0].reset_index(drop=True)
+    failures = {}
+    for part in parts:
+        for col, n in part.attrs["date_parse_failures"].items():
+            failures[col] = failures.get(col, 0) + n
+    frame.attrs["date_parse_failures"] = failures
+    return frame
+
+
+def validate_file(fname: str, data_dir: Path = DATA_DIR, chunk_rows: int = DQ_CHUNK_ROWS,
+                  quarantine: bool = False, keep_frame: bool = False) -> dict:
+    """
+    Stream one source file through the checks in chunks and replace it with
+    its accepted rows (values are written back as read, trimmed).
+    With quarantine=True the source is left alone; see quarantine_file.
+    With keep_frame=True the accepted rows are also returned typed like
+    analytics.load_data reads them (schema columns only), so the caller
+    does not have to parse the file again.
+    Returns dict: finding (report line), accepted (count, None if the file
+    is missing), problems (first MAX_PROBLEM_ROWS rejected rows or None),
+    manifest (clean-area entry or None), frame (typed accepted rows or None).
+    """
+    path = data_dir / fname
+    if not path.exists():
+        return _file_result(f"File missing: {fname}")
+    if quarantine:
+        return quarantine_file(fname, data_dir, chunk_rows, keep_frame)
+    if keep_frame:
+        from app_core.schema import schema_for, type_text_frame
+        schema = schema_for(fname)
+
+    total = accepted = 0
+    rejected_head = []
+    n_rejected_kept = 0
+    typed = []
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "w", newline="") as out:
+            for i, chunk in enumerate(pd.read_csv(path, dtype=str, chunksize=chunk_rows)):
+                chunk = clean_chunk(chunk)
+                masks = rule_masks(chunk, fname)
+                ok_mask = ~(masks["missing"] | masks["invalid"] | masks["negative"])
+                chunk[ok_mask].to_csv(out, index=False, header=(i == 0))
+                if keep_frame:
+                    typed.append(type_text_frame(chunk[ok_mask], schema))
+                total += len(chunk)
+                accepted += int(ok_mask.sum())
+                if n_rejected_kept < MAX_PROBLEM_ROWS and not ok_mask.all():
+                    bad = chunk[~ok_mask].head(MAX_PROBLEM_ROWS - n_rejected_kept)
+                    rejected_head.append(bad)
+                    n_rejected_kept += len(bad)
+        # persist accepted file into analytics location (overwrite)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+    rejected = total - accepted
+    return _file_result(
+        f"{fname}: total={total}, accepted={accepted}, rejected={rejected}",
+        accepted,
+        pd.concat(rejected_head) if rejected_head else None,
+        frame=_typed_frame(typed, fname) if keep_frame else None,
+    )
+
+
+def quarantine_file(fname: str, data_dir: Path = DATA_DIR, chunk_rows: int = DQ_CHUNK_ROWS,
+                    keep_frame: bool = False) -> dict:
+    """
+    Non-destructive check of one file: accepted rows go to the typed Parquet
+    clean area (data/clean/), rejected rows to data/quarantine/<fname> with a
+    dq_reason column. If the source's sha256 matches the manifest, the file
+    is not read again and the recorded result is returned.
+    Same arguments and return value as validate_file.
+    """
+    from app_core.clean_area import (CleanWriter, REASON_COL, entry_is_current, quarantine_path,
+                                     read_clean, read_manifest)
+    from app_core.data_cache import file_sha256
+    from app_core.schema import schema_for, schema_hash, type_text_frame
+
+    path = data_dir / fname
+    clean_dir, quarantine_dir = data_dir / "clean", data_dir / "quarantine"
+    schema = schema_for(fname)
+    stat = path.stat()
+    sha256 = file_sha256(path)
+
+    entry = read_manifest(clean_dir).get(fname)
+    if entry_is_current(fname, entry, sha256, schema, clean_dir, quarantine_dir):
+        problems = None
+        if entry["rejected"]:
+            problems = pd.read_csv(quarantine_path(fname, quarantine_dir), dtype=str, nrows=MAX_PROBLEM_ROWS)
+        entry = {**entry, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}  # touched, same content
+        frame = None
+        if keep_frame:
+            frame = read_clean(fname, schema, clean_dir)
+            frame.attrs["date_parse_failures"] = entry.get("date_parse_failures", {})
+        return _file_result(
+            f"{fname}: total={entry['total']}, accepted={entry['accepted']}, "
+            f"rejected={entry['rejected']} (unchanged, not re-validated)",
+            entry["accepted"], problems, entry, frame,
+        )
+
+    quarantine_dir.mkdir(parents=True, exist_ok=True)
+    q_target = quarantine_path(fname, quarantine_dir)
+    q_tmp = q_target.with_name(f"{q_target.name}.{os.getpid()}.tmp")
+    writer = CleanWriter(fname, schema, clean_dir)
+
+    total = accepted = 0
+    rejected_head = []
+    n_rejected_kept = 0
+    typed = []
+    header = None
+    try:
+        with open(q_tmp, "w", newline="") as q_out:
+            for chunk in pd.read_csv(path, dtype=str, chunksize=chunk_rows):
+                header = list(chunk.columns) if header is None else header
+                chunk = clean_chunk(chunk)
+                masks = rule_masks(chunk, fname)
+                ok_mask = ~(masks["missing"] | masks["invalid"] | masks["negative"])
+                if ok_mask.any():
+                    writer.write(chunk[ok_mask])
+                    if keep_frame:
+                        typed.append(type_text_frame(chunk[ok_mask], schema))
+                if not ok_mask.all():
+                    bad = chunk[~ok_mask].copy()
+                    bad[REASON_COL] = reason_codes({k: m[~ok_mask] for k, m in masks.items()})
+                    bad.to_csv(q_out, index=False, header=(total - accepted == 0))
+                    if n_rejected_kept < MAX_PROBLEM_ROWS:
+                        rejected_head.append(bad.head(MAX_PROBLEM_ROWS - n_rejected_kept))
+                        n_rejected_kept += len(rejected_head[-1])
+                total += len(chunk)
+                accepted += int(ok_mask.sum())
+        writer.close(columns=header)
+    except BaseException:
+        writer.abort()
+        q_tmp.unlink(missing_ok=True)
+        raise
+
+    rejected = total - accepted
+    if rejected:
+        os.replace(q_tmp, q_target)
+    else:
+        q_tmp.unlink()
+        q_target.unlink(missing_ok=True)
+
+    entry = {
+        "sha256": sha256,
+        "schema": schema_hash(schema),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "total": total,
+        "accepted": accepted,
+        "rejected": rejected,
+        "date_parse_failures": writer.date_parse_failures,
+    }
+    return _file_result(
+        f"{fname}: total={total}, accepted={accepted}, rejected={rejected}",
+        accepted,
+        pd.concat(rejected_head) if rejected_head else None,
+        entry,
+        _typed_frame(typed, fname) if keep_frame else None,
+    )
+
+
+def _validate_files(file_list, workers: int, quarantine: bool = False, keep_frame: bool = False) -> list:
+    """
+    validate_file over file_list, results in file_list order. With workers > 1
+    the files run in a process pool, largest first so the big files start
+    early; the merge order does not depend on which file finishes first.
+    """
+    options = {"quarantine": quarantine, "keep_frame": keep_frame}
+    if workers <= 1 or len(file_list) <= 1:
+        return [validate_file(fname, DATA_DIR, **options) for fname in file_list]
+
+    def size(fname):
+        path = DATA_DIR / fname
+        return path.stat().st_size if path.exists() else 0
+
+    # spawned, not forked: the mailer's background sender thread may hold a
+    # lock that a forked child would inherit (see app_core/charts/render.py)
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(file_list)), mp_context=spawn) as pool:
+        futures = {fname: pool.submit(validate_file, fname, DATA_DIR, **options)
+                   for fname in sorted(set(file_list), key=size, reverse=True)}
+        return [futures[fname].result() for fname in file_list]
+
+
+def run_data_quality(file_list, workers: int = 1, quarantine: bool = False, keep_frames: bool = False):
+    """
+    workers > 1 checks the files in parallel processes; findings, counts and
+    the e-mail are identical to the sequential run.
+    quarantine=True keeps the source CSVs and writes the clean / quarantine
+    areas instead (see quarantine_file); load_data then reads the clean area.
+    keep_frames=True also returns {fname: typed accepted rows} as a third
+    value, ready for analytics.run_analytics(raw=...) without a second parse.
+    """
     findings = []
     counts_by_subproduct = {}
     details_problem_rows = []
-    for fname in file_list:
-        path = DATA_DIR / fname
-        if not path.exists():
-            findings.append(f"File missing: {fname}")
+    manifest_entries = {}
+    frames = {}
+    for fname, result in zip(file_list, _validate_files(file_list, workers, quarantine, keep_frames)):
+        findings.append(result["finding"])
+        if result["manifest"] is not None:
+            manifest_entries[fname] = result["manifest"]
+        if result["accepted"] is None:
             continue
-        df = pd.read_csv(path)
-        # standard clean: trim strings
-        df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        # mandatory fields
-        missing_mask = df[MANDATORY_FIELDS.get(fname, [])].isna().any(axis=1) if MANDATORY_FIELDS.get(fname) else pd.Series(False, index=df.index)
-        # invalid values
-        invalid_mask = pd.Series(False, index=df.index)
-        for col, allowed in VALID_VALUE_RULES.items():
-            if col in df.columns:
-                invalid_mask = invalid_mask | (~df[col].astype(str).isin(allowed))
-        # negative
-        neg_mask = pd.Series(False, index=df.index)
-        for c in NO_NEGATIVE_COLS:
-            if c in df.columns:
-                neg_mask = neg_mask | (pd.to_numeric(df[c], errors='coerce') < 0)
-        # produce per-file report
-        total = len(df)
-        ok_mask = ~(missing_mask | invalid_mask | neg_mask)
-        accepted = df[ok_mask].copy()
-        rejected = df[~ok_mask].copy()
-        # persist accepted file into analytics location (overwrite)
-        accepted.to_csv(DATA_DIR / fname, index=False)
-        counts_by_subproduct[fname] = len(accepted)
-        if not rejected.empty:
-            details_problem_rows.append((fname, rejected.head(50)))  # include top 50 problem rows
-        findings.append(f"{fname}: total={total}, accepted={len(accepted)}, rejected={len(rejected)}")
+        counts_by_subproduct[fname] = result["accepted"]
+        if result["frame"] is not None:
+            frames[fname] = result["frame"]
+        if result["problems"] is not None:
+            details_problem_rows.append((fname, result["problems"]))  # include top 50 problem rows
+    if manifest_entries:
+        # one writer for the manifest, after all (possibly parallel) files are done
+        from app_core.clean_area import read_manifest, write_manifest
+        clean_dir = DATA_DIR / "clean"
+        write_manifest({**read_manifest(clean_dir), **manifest_entries}, clean_dir)
     # build email body
     body = "Data Quality Findings\n\n" + "\n".join(findings) + "\n\nDetails for problem rows:\n"
     for fname, dfp in details_problem_rows:
         body += f"\n\nFile: {fname}\n" + dfp.to_csv(index=False)
     # send email
     send_email("Weekly Report - Data Quality Findings", body)
+    if keep_frames:
+        return counts_by_subproduct, details_problem_rows, frames
     return counts_by_subproduct, details_problem_rows
@@ -6,24 +6,55 @@ from langchain_community.llms import HuggingFacePipeline
 
 MODEL_ID = os.environ.get("GEMMA_MODEL_ID", "google/gemma-2b-it")
 MAX_NEW_TOKENS = int(os.environ.get("GEMMA_MAX_NEW_TOKENS", "128"))
+# prompts generated together in one padded forward pass (llm.batch / chain.batch)
+BATCH_SIZE = int(os.environ.get("GEMMA_BATCH_SIZE", "8"))
+# CPU weight precision:
+#   float32  - full precision (~10 GB for gemma-2b)
+#   bfloat16 - half the memory; needs a CPU with bf16 support to be fast
+#   int8     - float32 load, then torch dynamic int8 quantization of the
+#              Linear layers (smallest resident size, fastest on most CPUs)
+PRECISION = os.environ.get("GEMMA_PRECISION", "float32")
+PRECISIONS = ("float32", "bfloat16", "int8")
 
-def create_gemma_llm(model_id: Optional[str] = None, max_new_tokens: int = MAX_NEW_TOKENS):
-    model_id = model_id or MODEL_ID
 
-    tokenizer = AutoTokenizer.from_pretrained(
-        model_id,
-        use_fast=True,
-        token=os.environ.get("HF_TOKEN"),
-    )
+def model_signature(model_id: Optional[str] = None, max_new_tokens: int = MAX_NEW_TOKENS,
+                    precision: str = PRECISION) -> str:
+    """Identifies what a configuration generates (used in interpretation cache keys)."""
+    return f"{model_id or MODEL_ID}|{precision}|max_new_tokens={max_new_tokens}"
+
 
+def load_model(model_id: str, precision: str = PRECISION):
+    if precision not in PRECISIONS:
+        raise ValueError(f"GEMMA_PRECISION must be one of {PRECISIONS}, got {precision!r}")
     model = AutoModelForCausalLM.from_pretrained(
         model_id,
         device_map="cpu",
-        torch_dtype=torch.float32,
+        torch_dtype=torch.bfloat16 if precision == "bfloat16" else torch.float32,
         low_cpu_mem_usage=True,
         trust_remote_code=True,
         token=os.environ.get("HF_TOKEN"),
     )
+    if precision == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model.eval()
+
+
+def create_gemma_llm(model_id: Optional[str] = None, max_new_tokens: int = MAX_NEW_TOKENS,
+                     batch_size: int = BATCH_SIZE, precision: str = PRECISION):
+    model_id = model_id or MODEL_ID
+
+    tokenizer = AutoTokenizer.from_pretrained(
+        model_id,
+        use_fast=True,
+        token=os.environ.get("HF_TOKEN"),
+    )
+    # decoder-only model: pad on the left so every prompt in a batch ends
+    # right where generation starts
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    model = load_model(model_id, precision)
 
     pipe = pipeline(
         "text-generation",
@@ -31,9 +62,10 @@ def create_gemma_llm(model_id: Optional[str] = None, max_new_tokens: int = MAX_N
         tokenizer=tokenizer,
         max_new_tokens=max_new_tokens,
         do_sample=False,
-        pad_token_id=tokenizer.eos_token_id,
+        batch_size=batch_size,
+        pad_token_id=tokenizer.pad_token_id,
         eos_token_id=tokenizer.eos_token_id,
         return_full_text=False,   
     )
 
-    return HuggingFacePipeline(pipeline=pipe)
+    return HuggingFacePipeline(pipeline=pipe, batch_size=batch_size)
@@ -0,0 +1,84 @@
+from pathlib import Path
+import hashlib
+import json
+import math
+import os
+import time
+
+# ---- On-disk cache of LLM chart interpretations ----
+# Generation is deterministic (do_sample=False), so the same model, prompt
+# template and chart numbers always give the same text. Entries are keyed on
+# exactly those, one small JSON file per entry. Re-runs, retries and weeks
+# with unchanged data then skip generation (and the model load) entirely.
+# Eviction: entries older than max_age_days go first, then the oldest until
+# the directory is under max_bytes.
+
+
+def _jsonable(value):
+    """Numbers rounded (so float noise does not change the key), NaN -> None."""
+    if isinstance(value, float):
+        return None if math.isnan(value) else round(value, 6)
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def cache_key(model: str, template: str, chart_name: str, inputs) -> str:
+    payload = {
+        "model": model,
+        "template": hashlib.sha256(template.encode()).hexdigest(),
+        "chart": chart_name,
+        "inputs": _jsonable(inputs),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class InterpretationCache:
+    def __init__(self, cache_dir: Path, max_age_days: float = 90, max_bytes: int = 50 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_age_s = max_age_days * 86400
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str):
+        """Cached text, or None (missing, unreadable or expired)."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > self.max_age_s:
+            return None
+        return entry.get("text")
+
+    def put(self, key: str, text: str, **meta):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"text": text, "created": time.time(), **meta}), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def evict(self) -> int:
+        """Drop expired entries, then the oldest until under max_bytes. Returns the number removed."""
+        if not self.cache_dir.exists():
+            return 0
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()  # oldest first
+
+        removed = 0
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age_s and total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
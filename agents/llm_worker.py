@@ -0,0 +1,140 @@
+"""
+Long-lived local LLM worker.
+
+Loading Gemma is most of the weekly job's wall-clock time, so the model can
+be kept resident in a separate process that the chart agent connects to:
+
+    python agents/llm_worker.py --port 8765          # loads the model once
+    LLM_WORKER_URL=http://127.0.0.1:8765 python agents/run_weekly_report.py
+
+HTTP on localhost only, JSON in/out:
+    GET  /health    -> {"status": "ok", "model": "<model signature>"}
+    POST /generate  {"prompts": ["...", ...]} -> {"texts": ["...", ...]}
+
+Any server that speaks this protocol (e.g. a stub returning canned text in
+tests) can stand in for the real one. RemoteLLM is the client side: a
+LangChain LLM, so `prompt | RemoteLLM(url=...)` works like the in-process
+HuggingFacePipeline.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Optional
+import argparse
+import json
+import threading
+import urllib.error
+import urllib.request
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, LLMResult
+
+DEFAULT_PORT = 8765
+HEALTH_TIMEOUT = 2.0
+
+
+# ---- server ----
+def make_handler(llm, model_id: str):
+    """Request handler bound to a loaded LangChain LLM (anything with .batch)."""
+    lock = threading.Lock()  # one generate at a time; /health stays responsive
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "model": model_id})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                prompts = json.loads(self.rfile.read(length))["prompts"]
+                with lock:
+                    texts = llm.batch(prompts)
+                self._send(200, {"texts": [str(t) for t in texts]})
+            except Exception as exc:
+                self._send(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+        def log_message(self, fmt, *args):  # keep the job log quiet
+            pass
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, llm=None, model_id: Optional[str] = None):
+    """Load the model once (unless `llm` is given) and serve until interrupted."""
+    if llm is None:
+        from gemma_llm import create_gemma_llm, model_signature
+        llm = create_gemma_llm(model_id)
+        model_id = model_signature(model_id)
+    server = ThreadingHTTPServer((host, port), make_handler(llm, model_id or "unknown"))
+    print(f"LLM worker ({model_id}) listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+# ---- client ----
+def worker_info(url: str, timeout: float = HEALTH_TIMEOUT):
+    """The worker's /health payload, or None if it is down or not ok."""
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/health", timeout=timeout) as resp:
+            info = json.loads(resp.read())
+    except (OSError, ValueError):
+        return None
+    return info if info.get("status") == "ok" else None
+
+
+def worker_healthy(url: str, timeout: float = HEALTH_TIMEOUT) -> bool:
+    return worker_info(url, timeout) is not None
+
+
+def remote_generate(url: str, prompts: List[str], timeout: float) -> List[str]:
+    req = urllib.request.Request(
+        f"{url.rstrip('/')}/generate",
+        data=json.dumps({"prompts": prompts}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        texts = json.loads(resp.read())["texts"]
+    if len(texts) != len(prompts):
+        raise RuntimeError(f"LLM worker returned {len(texts)} texts for {len(prompts)} prompts")
+    return texts
+
+
+class RemoteLLM(LLM):
+    """LangChain LLM backed by the worker; a batch is sent as one request."""
+
+    url: str
+    timeout: float = 600.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm_worker"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+              **kwargs: Any) -> str:
+        return remote_generate(self.url, [prompt], self.timeout)[0]
+
+    def _generate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> LLMResult:
+        texts = remote_generate(self.url, prompts, self.timeout)
+        return LLMResult(generations=[[Generation(text=t)] for t in texts])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the Gemma model resident and serve generations")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,196 @@
+"""
+Shared mail transport for the agents.
+
+send_email() builds the message, writes it to the on-disk outbox and
+returns; a background thread sends the outbox in order over one
+authenticated SMTP session per run (connect / STARTTLS / login once),
+retrying transient failures with a growing delay. A message that still
+fails stays in the outbox and is sent by the next run, or by
+
+    python agents/mailer.py            # flush the outbox now
+
+so a mail outage never means re-running analytics. flush() waits for the
+queue and closes the session; it also runs at interpreter exit.
+
+Testing against a local stand-in (no TLS, no auth):
+
+    python -m aiosmtpd -n -l 127.0.0.1:8025   # or any debugging SMTP server
+    SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=0 python agents/run_weekly_report.py
+"""
+from email import message_from_bytes
+from email.mime.application import MIMEApplication
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+import atexit
+import itertools
+import mimetypes
+import os
+import queue
+import smtplib
+import threading
+import time
+
+from config import EMAIL_FROM, EMAIL_TO, SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS
+from config import OUTBOX_DIR, SMTP_STARTTLS, SMTP_TIMEOUT, MAIL_RETRIES, MAIL_RETRY_DELAY
+
+
+def is_transient(exc: Exception) -> bool:
+    """
+    Worth retrying on a fresh connection: network errors, dropped sessions and
+    4xx replies. Anything else (bad recipient, auth rejected, ...) would fail
+    the same way again.
+    """
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+def build_message(subject: str, body_text: str, attachments=()) -> MIMEMultipart:
+    """Plain-text body, then the attachments in order (images inline-able, rest as files)."""
+    msg = MIMEMultipart()
+    msg["From"] = EMAIL_FROM
+    msg["To"] = ",".join(EMAIL_TO)
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body_text, "plain"))
+    for p in attachments:
+        data = Path(p).read_bytes()
+        ctype = mimetypes.guess_type(str(p))[0] or "application/octet-stream"
+        if ctype.startswith("image/"):
+            part = MIMEImage(data, _subtype=ctype.split("/")[1])
+        else:
+            part = MIMEApplication(data, _subtype=ctype.split("/")[1])
+        part.add_header("Content-Disposition", "attachment", filename=Path(p).name)
+        msg.attach(part)
+    return msg
+
+
+class SMTPSession:
+    """One lazily opened, authenticated connection, reopened after a drop."""
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, user=SMTP_USER, password=SMTP_PASS,
+                 starttls=SMTP_STARTTLS, timeout=SMTP_TIMEOUT):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp = None
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.user:
+            smtp.login(self.user, self.password)
+        self._smtp = smtp
+
+    def send(self, msg):
+        if self._smtp is None:
+            self._connect()
+        self._smtp.send_message(msg)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class Mailer:
+    """
+    Outbox + background sender. Messages are files <outbox>/<time>_<seq>.eml
+    (written atomically) and are removed once sent; leftovers of earlier runs
+    are queued first, so the send order is the queue order.
+    """
+
+    def __init__(self, outbox: Path = OUTBOX_DIR, session: SMTPSession = None,
+                 retries: int = MAIL_RETRIES, retry_delay: float = MAIL_RETRY_DELAY):
+        self.outbox = Path(outbox)
+        self.outbox.mkdir(parents=True, exist_ok=True)
+        self.session = session or SMTPSession()
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.failed = []
+        self._seq = itertools.count()
+        self._queue = queue.Queue()
+        for path in sorted(self.outbox.glob("*.eml")):
+            self._queue.put(path)
+        self._thread = threading.Thread(target=self._worker, name="mailer", daemon=True)
+        self._thread.start()
+
+    def send(self, subject: str, body_text: str, attachments=()) -> Path:
+        """Queue a message; returns its outbox file without waiting for SMTP."""
+        msg = build_message(subject, body_text, attachments)
+        path = self.outbox / f"{time.time_ns()}_{next(self._seq):04d}.eml"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(msg.as_bytes())
+        os.replace(tmp, path)
+        self._queue.put(path)
+        return path
+
+    def _deliver(self, path: Path):
+        msg = message_from_bytes(path.read_bytes())
+        for attempt in range(self.retries + 1):
+            try:
+                self.session.send(msg)
+                path.unlink(missing_ok=True)
+                return
+            except Exception as exc:
+                self.session.close()
+                if attempt == self.retries or not is_transient(exc):
+                    raise
+                delay = self.retry_delay * 2 ** attempt
+                print(f"Mail {path.name}: {type(exc).__name__}: {exc}; retrying in {delay:g}s")
+                time.sleep(delay)
+
+    def _worker(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if path is None:
+                    self.session.close()
+                    return
+                self._deliver(path)
+            except Exception as exc:  # stays in the outbox for the next run
+                self.failed.append(path)
+                print(f"Mail {path.name} not sent ({type(exc).__name__}: {exc}); kept in {self.outbox}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> list:
+        """Wait until the queue is sent, close the session; returns the outbox files left unsent."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        return list(self.failed)
+
+
+_mailer = None
+_lock = threading.Lock()
+
+
+def get_mailer() -> Mailer:
+    global _mailer
+    with _lock:
+        if _mailer is None or not _mailer._thread.is_alive():
+            _mailer = Mailer()
+            atexit.register(_mailer.flush)
+        return _mailer
+
+
+def send_email(subject: str, body_text: str, attachments=()) -> Path:
+    return get_mailer().send(subject, body_text, attachments)
+
+
+def flush() -> list:
+    return get_mailer().flush() if _mailer is not None else []
+
+
+if __name__ == "__main__":
+    left = get_mailer().flush()
+    print(f"Outbox flushed; {len(left)} message(s) left in {OUTBOX_DIR}")
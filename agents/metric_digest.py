@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from prompts import CHART_DIGEST_METRICS, CHART_MARGIN_FRAMES
+
+# ---- Numeric digest of the weekly charts ----
+# Per chart and product group (rows of run_analytics()["group_metrics"],
+# the same numbers the charts plot; margin type for the margin call charts):
+# the last two weeks, the WoW % change and its classify_change class. Only
+# High / Medium movers are sent to the LLM, as a few structured lines; Low and
+# "No change" rows get templated sentences. Fewer prompts, shorter prompts,
+# and the text is grounded in the report's own numbers.
+
+LLM_CLASSES = ("High", "Medium")
+
+
+def classify_change(pct_change: float) -> str:
+    """Return High/Medium/Low rule-based classification"""
+    if np.isnan(pct_change):
+        return "No change"
+    a = abs(pct_change)
+    if a >= 50:
+        return "High"
+    if a >= 15:
+        return "Medium"
+    return "Low"
+
+
+def pct_change(prev: float, last: float) -> float:
+    """WoW % change; NaN when there is no prior-week base (0 -> 0 is no change)."""
+    if np.isnan(prev) or np.isnan(last):
+        return float("nan")
+    if prev == 0:
+        return 0.0 if last == 0 else float("nan")
+    return (last - prev) / abs(prev) * 100.0
+
+
+def _digest_rows(chart: str, metric: str, frame: pd.DataFrame, period: str) -> list:
+    rows = []
+    if frame.shape[1] < 2:
+        return rows
+    for group, vals in frame.iterrows():
+        prev, last = float(vals.iloc[-2]), float(vals.iloc[-1])
+        if np.isnan(prev) and np.isnan(last):
+            continue
+        pct = pct_change(prev, last)
+        rows.append({
+            "chart": chart, "group": str(group), "metric": metric, "period": period,
+            "prev": prev, "last": last, "pct_change": pct, "class": classify_change(pct),
+        })
+    return rows
+
+
+def build_digest(results) -> dict:
+    """chart name -> digest rows (dicts) for the last week of the report."""
+    from app_core.charts.disputed_margin_calls_chart import disputed_weekly
+
+    group_metrics = results["group_metrics"]
+    period = str(group_metrics.columns[-1]) if len(group_metrics.columns) else ""
+    digest = {}
+    for chart, metrics in CHART_DIGEST_METRICS.items():
+        digest[chart] = []
+        for metric in metrics:
+            if group_metrics.empty:
+                continue
+            frame = group_metrics.xs(metric, level="metric")
+            digest[chart] += _digest_rows(chart, metric, frame, period)
+
+    weeks, counts, amounts = disputed_weekly(results["df_margincalls"])
+    frames = {"counts": ("Disputed margin calls", counts), "amounts": ("Disputed amount (USD)", amounts)}
+    for chart, which in CHART_MARGIN_FRAMES.items():
+        metric, frame = frames[which]
+        digest[chart] = _digest_rows(chart, metric, frame.astype(float), str(weeks[-1]) if weeks else "")
+    return digest
+
+
+def _fmt(value: float, metric: str) -> str:
+    if np.isnan(value):
+        return "n/a"
+    if "%" in metric:
+        return f"{value:.1f}%"
+    return f"{value:,.0f}" if abs(value) >= 100 or float(value).is_integer() else f"{value:,.2f}"
+
+
+def movers(rows) -> list:
+    return [r for r in rows if r["class"] in LLM_CLASSES]
+
+
+def mover_lines(rows) -> str:
+    """The structured prompt lines, largest moves first."""
+    rows = sorted(rows, key=lambda r: -abs(r["pct_change"]))
+    return "\n".join(
+        f"- {r['group']}, {r['metric']}: {_fmt(r['prev'], r['metric'])} -> {_fmt(r['last'], r['metric'])} "
+        f"({r['pct_change']:+.1f}% WoW, {r['class']})"
+        for r in rows
+    )
+
+
+def prompt_inputs(digest: dict) -> dict:
+    """chart -> INTERPRETATION_TEMPLATE variables, for the charts with High/Medium movers only."""
+    inputs = {}
+    for chart, rows in digest.items():
+        top = movers(rows)
+        if top:
+            inputs[chart] = {"chart_name": chart, "period": top[0]["period"], "movers": mover_lines(top)}
+    return inputs
+
+
+def mover_sentence(chart: str, rows) -> str:
+    """Templated stand-in for the LLM paragraph (no model, or generation failed)."""
+    parts = [f"{r['group']} {r['metric']} {r['pct_change']:+.1f}% ({r['class']})"
+             for r in sorted(movers(rows), key=lambda r: -abs(r["pct_change"]))]
+    return f"{chart}: notable week-on-week moves: " + "; ".join(parts) + "." if parts else ""
+
+
+def templated_sentences(chart: str, rows) -> str:
+    """Sentences for the Low and "No change" rows of a chart."""
+    low = [r for r in rows if r["class"] == "Low"]
+    no_base = [r for r in rows if r["class"] == "No change"]
+    sentences = []
+    for metric in dict.fromkeys(r["metric"] for r in low):
+        parts = ", ".join(f"{r['group']} {_fmt(r['last'], metric)} ({r['pct_change']:+.1f}%)"
+                          for r in low if r["metric"] == metric)
+        sentences.append(f"{chart}: {metric} stable week on week: {parts}.")
+    if no_base:
+        groups = ", ".join(f"{r['group']} {_fmt(r['last'], r['metric'])}" for r in no_base)
+        sentences.append(f"{chart}: no prior-week base for {groups}.")
+    return " ".join(sentences)
@@ -0,0 +1,41 @@
+# Prompts for the weekly chart interpretations (shared by chart_agent and
+# the benchmarks so they always exercise the real weekly prompts).
+
+# {movers}: one line per High/Medium mover from the metric digest
+# (agents/metric_digest.py); Low movers never reach the model.
+INTERPRETATION_TEMPLATE = (
+    "You are an analyst at an investment bank covering equities, bonds, and derivatives.\n"
+    "Week-on-week movers for {chart_name}, week {period}:\n"
+    "{movers}\n"
+    "Write a short executive paragraph (2–3 lines) stating:\n"
+    "- the largest moves, with their numbers\n"
+    "- one likely business reason\n"
+    "- one practical action to take\n"
+    "Respond with only the paragraph."
+)
+
+CHART_ITEMS = [
+    "Deal Volumes",
+    "Deal Values",
+    "Trade Capture STP",
+    "Settlement STP",
+    "Unconfirmed deals (counts)",
+    "Unsettled deals (counts)",
+    "Disputed Marin Calls (counts)",
+    "Disputed Margin Amounts",
+]
+
+# chart -> run_analytics()["group_metrics"] rows digested per product group
+CHART_DIGEST_METRICS = {
+    "Deal Volumes": ["Number of deals"],
+    "Deal Values": ["Deal value (in USD mn)"],
+    "Trade Capture STP": ["Trade capture STP %"],
+    "Settlement STP": ["Settlement STP %"],
+    "Unconfirmed deals (counts)": ["Number of unconfirmed deals"],
+    "Unsettled deals (counts)": ["Number of unsettled deals"],
+}
+# margin call charts -> which disputed_weekly frame they show
+CHART_MARGIN_FRAMES = {
+    "Disputed Marin Calls (counts)": "counts",
+    "Disputed Margin Amounts": "amounts",
+}
@@ -1,13 +1,37 @@
 from data_quality_agent import run_data_quality
 from analytics_agent import run_analytics_and_notify
 from chart_agent import run_charts_and_interpret
-from config import DATA_DIR
+from config import DATA_DIR, DQ_WORKERS, DQ_MODE, DQ_SNAPSHOT
+import mailer
 
 def run_all(file_list):
-    # step 1: data quality
-    counts_by_subproduct, details = run_data_quality(file_list)
+    # e-mails are queued in the outbox and sent in the background while the
+    # stages run; flush() at the end waits for them (unsent ones stay queued)
+    try:
+        return _run_stages(file_list)
+    finally:
+        unsent = mailer.flush()
+        if unsent:
+            print(f"{len(unsent)} e-mail(s) not sent; run `python agents/mailer.py` to retry")
+
+
+def _run_stages(file_list):
+    # step 1: data quality (also returns the accepted rows, typed, so each
+    # file is parsed once for the whole run)
+    quarantine = DQ_MODE == "quarantine"
+    counts_by_subproduct, details, frames = run_data_quality(
+        file_list, workers=DQ_WORKERS, quarantine=quarantine, keep_frames=True)
+    if DQ_SNAPSHOT and not quarantine:  # quarantine mode already wrote data/clean/
+        from app_core.data_cache import prime_cache
+        from app_core.schema import schema_for
+        for fname, df in frames.items():
+            prime_cache(DATA_DIR / fname, df, schema_for(fname))
+    # the rewritten files make the week partitions stale; rebuild them (when
+    # set up) so analytics keeps reading only the report window
+    from app_core.partitions import refresh_partitions
+    refresh_partitions(frames)
     # step 2: analytics
-    results = run_analytics_and_notify()
+    results = run_analytics_and_notify(frames)
     # step 3: charts and interpretation
     highlights, images = run_charts_and_interpret(results)
     # optionally persist highlights to a file used by Streamlit for Weekly Highlights textbox
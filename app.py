@@ -1,45 +1,119 @@
 
 import streamlit as st
 import numpy as np
-from app_core.analytics import run_analytics
+from app_core.analytics import run_analytics, format_metrics, cube_subproducts
+from app_core.analytics import DEFAULT_CUTOFF_DATE, AS_OF_LATEST, data_fingerprint, change_label
 #from app_core.analytics import load_data
-from app_core.charts.num_deals_chart import plot_deal_volumes
-from app_core.charts.val_deals_chart import plot_deal_value
-from app_core.charts.trade_cap_stp_chart import plot_trade_cap_stp
-from app_core.charts.settlement_stp_chart import plot_settlement_stp
-from app_core.charts.unconfirmed_deals_chart import plot_deals_unconfirmed
-from app_core.charts.unsettled_deals_chart import plot_deals_unsettled
-from app_core.charts.disputed_margin_calls_chart import plot_disputed_margin_calls
+from app_core.charts.render import render_charts
+from app_core.data_cache import CACHE_DIR
+from app_core.drilldown import build_trade_index, query_trades, STATUSES, SORT_COLUMNS, PAGE_SIZE
 from st_aggrid import AgGrid, GridOptionsBuilder, DataReturnMode, GridUpdateMode
 from st_aggrid.shared import JsCode
 from pathlib import Path
+import os
+import shutil
 
 
 def _show_fig_in_column(col, fig, caption=None):
-    """Safe helper: shows fig if not None"""
+    """Safe helper: shows fig (a rendered PNG path) if not None"""
     if fig is None:
         col.write("_No data available_")
     else:
         if caption:
             col.subheader(caption)
-        col.pyplot(fig)
+        col.image(fig)
+
+# Process-wide caches shared by all sessions: keyed on the cutoff date and a
+# fingerprint of the data/ CSVs, so widget reruns reuse the results and a
+# new data drop invalidates them. Streamlit computes each key only once even
+# when several users hit it concurrently. Callers must not mutate the values.
+@st.cache_resource(max_entries=4, show_spinner="Running analytics...")
+def cached_results(cutoff_date_str: str, data_version: str):
+    return run_analytics(cutoff_date_str, as_of=AS_OF_LATEST)
+
+
+# Charts are rendered once per key to PNG files (process pool, figures
+# closed after saving) instead of keeping eight large Figures alive and
+# re-encoding them on every rerun. dpi 200 matches what st.pyplot used.
+# Only the newest CHART_DIRS_KEPT key directories stay on disk, as many as
+# the cache can hold, so evicted keys do not leave their PNGs behind.
+CHART_DIR = CACHE_DIR / "charts"
+CHART_DIRS_KEPT = 4
+
+
+def _prune_chart_dirs(keep: int = CHART_DIRS_KEPT):
+    dirs = sorted((d for d in CHART_DIR.iterdir() if d.is_dir()), key=lambda d: d.stat().st_mtime_ns, reverse=True)
+    for d in dirs[keep:]:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+@st.cache_resource(max_entries=CHART_DIRS_KEPT, show_spinner="Rendering charts...")
+def cached_figures(cutoff_date_str: str, data_version: str):
+    results = cached_results(cutoff_date_str, data_version)
+    out_dir = CHART_DIR / f"{cutoff_date_str}_{data_version}"
+    paths = render_charts(results, out_dir, dpi=200)
+    os.utime(out_dir)  # newest, even when re-rendered over existing files
+    _prune_chart_dirs()
+    keys = ["fig1", "fig2", "fig3", "fig4", "fig5", "fig6", "fig_counts", "fig_amounts"]
+    return dict(zip(keys, paths))
+
+
+@st.cache_resource(max_entries=4, show_spinner="Indexing trades...")
+def cached_trade_index(cutoff_date_str: str, data_version: str):
+    return build_trade_index(cached_results(cutoff_date_str, data_version)["deals_4w"])
+
+
+def _show_trade_drilldown(trade_index, sub_product, week_names):
+    """
+    Trades behind the summary numbers; only the requested page is sent to the
+    grid. week_names: trade_index week -> report week label.
+    """
+    st.subheader(f"Trade drill-down — {sub_product}")
+    f1, f2, f3 = st.columns(3)
+    status = f1.selectbox("Trades", STATUSES, key="drill_status")
+    week = f2.selectbox("Week", [None] + trade_index["weeks"], key="drill_week",
+                        format_func=lambda w: "All weeks" if w is None else week_names.get(w, w))
+    search = f3.text_input("Trade ID contains", key="drill_search")
+    s1, s2, s3 = st.columns(3)
+    sort_by = s1.selectbox("Sort by", SORT_COLUMNS, key="drill_sort")
+    ascending = s2.radio("Order", ["Ascending", "Descending"], horizontal=True, key="drill_order") == "Ascending"
+
+    filters = dict(sub_product=sub_product, status=status, week=week,
+                   search=search.strip(), sort_by=sort_by, ascending=ascending)
+    # keyed on the filters: any change starts a fresh widget on page 1
+    # instead of keeping a page number the narrower result may not have.
+    # The page is read before the widget is drawn so one query returns both
+    # the rows and the total the page count comes from.
+    page_key = "drill_page:" + ":".join(str(v) for v in filters.values())
+    page = st.session_state.get(page_key, 1)
+    page_df, total = query_trades(trade_index, page=page - 1, page_size=PAGE_SIZE, **filters)
+    n_pages = max(1, -(-total // PAGE_SIZE))
+    if page > n_pages:  # new data with fewer trades under a stored page number
+        page = st.session_state[page_key] = n_pages
+        page_df, total = query_trades(trade_index, page=page - 1, page_size=PAGE_SIZE, **filters)
+    s3.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, key=page_key)
+    st.caption(f"{total:,} matching trades; showing {len(page_df)} from row {(page - 1) * PAGE_SIZE + 1:,}")
+
+    gb = GridOptionsBuilder.from_dataframe(page_df)
+    gb.configure_default_column(editable=False, resizable=True, sortable=False, filter=False)
+    AgGrid(page_df, gridOptions=gb.build(), height=400, update_mode=GridUpdateMode.NO_UPDATE)
+    st.download_button("Download this page as CSV", page_df.to_csv(index=False),
+                       file_name=f"{sub_product}_trades_p{page}.csv", mime="text/csv")
+
 
 def main():
     st.set_page_config(layout="wide")
     st.title("Investment Banking Performance Analytics Dashboard")
 
-    results = run_analytics()  # uses default cutoff_date_str
-    deals_4w = results.get("deals_4w")
-    subproduct_metrics = results["subproduct_metrics"]
-    df_margincalls = results["df_margincalls"]
+    data_version = data_fingerprint()
+    results = cached_results(DEFAULT_CUTOFF_DATE, data_version)
+    metrics_cube = results["metrics_cube"]
 
-    fig1 = plot_deal_volumes(subproduct_metrics)
-    fig2 = plot_deal_value(subproduct_metrics)
-    fig3 = plot_trade_cap_stp(subproduct_metrics)
-    fig4 = plot_settlement_stp(subproduct_metrics, deals_4w=deals_4w)
-    fig5 = plot_deals_unconfirmed(subproduct_metrics)
-    fig6 = plot_deals_unsettled(subproduct_metrics)
-    fig_counts, fig_amounts = plot_disputed_margin_calls(df_margincalls)
+    figs = cached_figures(DEFAULT_CUTOFF_DATE, data_version)
+    trade_index = cached_trade_index(DEFAULT_CUTOFF_DATE, data_version)
+    fig1, fig2, fig3, fig4 = figs["fig1"], figs["fig2"], figs["fig3"], figs["fig4"]
+    fig5, fig6 = figs["fig5"], figs["fig6"]
+    fig_counts, fig_amounts = figs["fig_counts"], figs["fig_amounts"]
 
     # Tabs: first tab is Weekly Highlights (free-text bullets)
     tab_names = ["Weekly Highlights","Summary", "Deal Vol/Value", "STP", "Breaks", "Collateral Disputes"]
@@ -101,11 +175,11 @@ def main():
     with tabs[1]:
         st.header("Weekly Metrics — Summary - 2025")
 
-        if not subproduct_metrics or len(subproduct_metrics) == 0:
+        if metrics_cube is None or metrics_cube.empty:
             st.warning("No summary metrics available.")
         else:
             # product list and default selection
-            product_list = sorted(subproduct_metrics.keys())
+            product_list = cube_subproducts(metrics_cube)
             default_product = "Bonds" if "Bonds" in product_list else product_list[0]
 
             selected_product = st.selectbox(
@@ -115,36 +189,32 @@ def main():
                 help="Choose the product subtype to view weekly metrics"
             )
 
-            # get the metrics dataframe for selected product
-            metrics_df = subproduct_metrics.get(selected_product)
+            # numeric metrics for selected product (metric x week)
+            numeric_df = metrics_cube.xs(selected_product, level="Product_subtype")
 
-            if metrics_df is None or metrics_df.empty:
+            if numeric_df.empty:
               st.info("No metrics for selected product")
             else:
               st.subheader(f"Metrics for: {selected_product}")
 
-              latest_col = metrics_df.columns[-1]
-
-              def safe_float(x):
-                  try:
-                      s = str(x).replace(",", "").replace("%", "").strip()
-                      return float(s)
-                  except:
-                      return float("nan")
+              latest_col = numeric_df.columns[-1]
 
-              total_deals = safe_float(metrics_df.loc["Number of deals", latest_col])
-              deal_value = safe_float(metrics_df.loc["Deal value (in USD mn)", latest_col])
-              unconfirmed_pct = safe_float(metrics_df.loc["Unconfirmed deals % change WoW", latest_col])
-              stp_pct = safe_float(metrics_df.loc["Trade capture STP %", latest_col])
+              total_deals = numeric_df.at["Number of deals", latest_col]
+              deal_value = numeric_df.at["Deal value (in USD mn)", latest_col]
+              unconfirmed_pct = numeric_df.at["Unconfirmed deals % change WoW", latest_col]
+              stp_pct = numeric_df.at["Trade capture STP %", latest_col]
 
               k1, k2, k3, k4 = st.columns(4)
               k1.metric("Deals (latest week)", f"{total_deals:,.0f}" if not np.isnan(total_deals) else "-")
               k2.metric("Deal Value (USD Mn)", f"{deal_value:,.0f}" if not np.isnan(deal_value) else "-")
-              k3.metric("Unconfirmed deals % WoW", f"{unconfirmed_pct:.1f}%" if not np.isnan(unconfirmed_pct) else "-")
+              k3.metric(f"Unconfirmed deals % {change_label(results['freq'])}", f"{unconfirmed_pct:.1f}%" if not np.isnan(unconfirmed_pct) else "-")
               k4.metric("Trade Cap STP %", f"{stp_pct:.1f}%" if not np.isnan(stp_pct) else "-")
 
               st.divider()
 
+              # display strings are built here, at render time
+              metrics_df = format_metrics(metrics_cube, selected_product, results["freq"])
+
               # Convert index to a proper column for AgGrid
               df_for_grid = metrics_df.reset_index().rename(columns={"index": "Metric"})
               # optional: re-order columns so Metric is first
@@ -206,6 +276,10 @@ def main():
               csv = grid_response["data"].to_csv(index=False)
               st.download_button("Download visible table as CSV", csv, file_name=f"{selected_product}_metrics_view.csv", mime="text/csv")
 
+              st.divider()
+              week_names = dict(zip(map(str, results["week_order"]), results["week_labels"]))
+              _show_trade_drilldown(trade_index, selected_product, week_names)
+
         # Tab 1: Deal Vol/Value (fig1, fig2)
     with tabs[2]:
         c1, c2 = st.columns(2)
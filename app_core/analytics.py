@@ -1,54 +1,452 @@
 from pathlib import Path
+import hashlib
 import pandas as pd
 import numpy as np
+from app_core.data_cache import DATA_DIR, read_csv_cached
+from app_core.schema import schema_for, concat_typed, DATE_FMT
+from app_core.partitions import PARTITION_DIR, MANIFEST_FILE
+from app_core.partitions import partitions_available, partition_weeks, read_partitions
+from app_core.clean_area import CLEAN_DIR, clean_available, read_clean
+from app_core.clean_area import MANIFEST_FILE as CLEAN_MANIFEST_FILE
 
 # this file is in: my-streamlit-app/app_core/analytics.py
 BASE_DIR = Path(__file__).resolve().parents[1]  # -> my-streamlit-app/
-DATA_DIR = BASE_DIR / "data"
 
-def load_data():
+DEFAULT_CUTOFF_DATE = "2025-12-06"
+# run_analytics(as_of=AS_OF_LATEST): window ends at the latest Trade_date in the data
+AS_OF_LATEST = "latest"
+
+# run_analytics(freq=...) -> pandas period frequency
+PERIOD_FREQS = {
+    "W": "W-SUN",
+    "weekly": "W-SUN",
+    "M": "M",
+    "monthly": "M",
+    "Q": "Q",
+    "quarterly": "Q",
+}
+
+# load_data key -> source file under data/
+SOURCE_KEYS = {
+    "equity": "df_equity.csv",
+    "fixedincome": "df_fixedincome.csv",
+    "repos": "df_repos.csv",
+    "fxspot": "df_fxspot.csv",
+    "derfx": "df_derfx.csv",
+    "dereq": "df_dereq.csv",
+    "derint": "df_derint.csv",
+    "dercr": "df_dercr.csv",
+    "margincalls": "df_margincalls.csv",
+}
+SOURCE_FILES = list(SOURCE_KEYS.values())
+DEAL_KEYS = [k for k in SOURCE_KEYS if k != "margincalls"]
+
+
+def data_fingerprint(data_dir: Path = DATA_DIR) -> str:
     """
-    Load all deal data, compute weekly metrics per Product_subtype,
-    and return a dictionary with results usable by app.py and chart modules.
+    Cheap version stamp of the source CSVs (name, size, mtime; no content
+    read). Changes whenever any data file is replaced, so it can be used as
+    a cache key next to the cutoff date.
     """
+    h = hashlib.sha256()
+    for fname in SOURCE_FILES:
+        path = data_dir / fname
+        if path.exists():
+            stat = path.stat()
+            h.update(f"{fname}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        else:
+            h.update(f"{fname}:missing;".encode())
+    for name, manifest in (("partitions", PARTITION_DIR / MANIFEST_FILE),
+                           ("clean", CLEAN_DIR / CLEAN_MANIFEST_FILE)):
+        if manifest.exists():
+            h.update(f"{name}:{manifest.stat().st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
+
+
+def _read_source(fname: str) -> pd.DataFrame:
+    """Clean-area Parquet (written by the quarantine-mode data quality step) if
+    it is current for the source file, otherwise the cached CSV parse."""
+    path = DATA_DIR / fname
+    if clean_available(fname, path):
+        return read_clean(fname, schema_for(fname))
+    return read_csv_cached(path, schema_for(fname))
+
+
+def load_data(weeks=None):
+    """
+    Load all source files (only the columns declared in app_core.schema,
+    typed, via the Parquet cache) and return a dict: key -> DataFrame.
+    Files validated in quarantine mode are read from the clean area instead.
+
+    weeks: optional list of W-SUN periods. When given and the partitioned
+    layout under data/deals/ exists, deal data is read from just those
+    week partitions (margin calls always come from their CSV).
+    """
+    if weeks is not None and partitions_available():
+        raw = read_partitions({k: SOURCE_KEYS[k] for k in DEAL_KEYS}, weeks)
+        raw["margincalls"] = _read_source(SOURCE_KEYS["margincalls"])
+        return raw
+
+    return {key: _read_source(fname) for key, fname in SOURCE_KEYS.items()}
+
 
-    # ---- Load all CSVs ----
-    eq_data_path = DATA_DIR / "df_equity.csv"
-    fi_data_path = DATA_DIR / "df_fixedincome.csv"
-    repo_data_path = DATA_DIR / "df_repos.csv"
-    fxspot_data_path = DATA_DIR / "df_fxspot.csv"
-    derfx_data_path = DATA_DIR / "df_derfx.csv"
-    dereq_data_path = DATA_DIR / "df_dereq.csv"
-    derint_data_path = DATA_DIR / "df_derint.csv"
-    dercr_data_path = DATA_DIR / "df_dercr.csv"
-    call_data_path = DATA_DIR / "df_margincalls.csv"
-
-
-    df_equity = pd.read_csv(eq_data_path)
-    df_fixedincome = pd.read_csv(fi_data_path)
-    df_repos = pd.read_csv(repo_data_path)
-    df_fxspot = pd.read_csv(fxspot_data_path)
-    df_derfx = pd.read_csv(derfx_data_path)
-    df_dereq = pd.read_csv(dereq_data_path)
-    df_derint = pd.read_csv(derint_data_path)
-    df_dercr = pd.read_csv(dercr_data_path)
-    df_margincalls = pd.read_csv(call_data_path)
+def date_parse_report(raw: dict) -> dict:
+    """
+    Date values that failed to parse, per source file and column
+    (only non-zero counts): {"df_equity.csv": {"Trade_date": 3}, ...}.
+    """
+    report = {}
+    for key, df in raw.items():
+        failed = {c: n for c, n in df.attrs.get("date_parse_failures", {}).items() if n}
+        if failed:
+            report[SOURCE_KEYS.get(key, key)] = failed
+    return report
+
+
+# ---- Metric rows of every per-subtype metrics_df (display order) ----
+METRIC_ROWS = [
+    "Number of deals",
+    "Number of deals % change WoW",
+    "Deal value (in USD mn)",
+    "Deal value % change WoW",
+    "Trade capture STP %",
+    "Number of unconfirmed deals",
+    "Unconfirmed deals % change WoW",
+    "Number of unsettled deals",
+    "Unsettled deals % change WoW",
+    "Settlement cash STP %",
+    "Settlement securities STP %",
+]
+
+# the group cube adds the combined (cash + physical) settlement STP the
+# settlement chart plots; per subtype only the split rows are shown
+GROUP_METRIC_ROWS = METRIC_ROWS + ["Settlement STP %"]
+
+# METRIC_ROWS are the cube keys for every frequency; the "% change" rows
+# are shown as period-over-period for the run's freq (format_metrics)
+CHANGE_LABELS = {"W-SUN": "WoW", "M": "MoM", "Q": "QoQ"}
+
+
+def change_label(freq: str = "W") -> str:
+    return CHANGE_LABELS[PERIOD_FREQS[freq]]
+
+
+def metric_rows(freq: str = "W") -> list:
+    """Display labels of METRIC_ROWS for freq ("% change WoW" / "MoM" / "QoQ")."""
+    return [row.replace("% change WoW", f"% change {change_label(freq)}") for row in METRIC_ROWS]
+
+
+COUNT_ROWS = [
+    "Number of deals",
+    "Number of unconfirmed deals",
+    "Number of unsettled deals",
+]
+
+# rules for cash-only / physical-only products
+PHYSICAL_ONLY_PRODUCTS = {
+    "Cash Equity",
+    "Bonds",
+    "NCD",
+    "Secured Notes",
+    "Repo",
+    "ReverseRepo",
+    "Forex-Spot",
+    "FxForwards",
+    "FxFutures",
+}
+
+CASH_ONLY_PRODUCTS = {
+    "FxSwaps",
+    "IntRateSwaps",
+    "IntRateFRA",
+}
+
+# ---- Product groups of the report charts ----
+# group name -> Product_subtype values, in chart order
+GROUP_MAP = {
+    "Cash Equity": ["Cash Equity"],
+    "Fixed Income": ["Bonds", "NCD", "Secured Notes"],
+    "Repos": ["Repo", "ReverseRepo"],
+    "Equity Derivatives": ["EqFutures", "EqOptions", "EqSwaps", "IndFutures", "IndOptions"],
+    "Forex Spot & Derivatives": ["Forex-Spot", "FxForwards", "FxFutures", "FxOptions", "FxSwaps"],
+    "Int Rate Derivatives": ["IntRateFRA", "IntRateOptions", "IntRateSwaps"],
+    "Credit Derivatives": ["CDS", "TRS"],
+}
+GROUP_NAMES = list(GROUP_MAP)
+SUBTYPE_GROUP = {sub: group for group, subs in GROUP_MAP.items() for sub in subs}
+
+# additive per-(Product_subtype, week) aggregates the metrics are derived from
+AGGREGATE_COLS = [
+    "num_deals",
+    "deal_value",
+    "stp_yes",
+    "num_unconfirmed",
+    "num_unsettled",
+    "cash_total",
+    "cash_stp_yes",
+    "physical_total",
+    "physical_stp_yes",
+]
+
+
+def weekly_aggregates(deals: pd.DataFrame, period_col: str = "week") -> pd.DataFrame:
+    """
+    One grouped pass over (Product_subtype, week): boolean flag columns are
+    precomputed once and summed, so no Python code runs per group.
+    Returns a frame indexed by (Product_subtype, week) with AGGREGATE_COLS.
+    period_col selects another period column (e.g. monthly) to group on.
+    """
+    settlement_type = deals["Settlement_type"]
+    settlement_stp_yes = deals["Settlement_stp"].eq("Y")
+    is_cash = settlement_type.eq("Cash")
+    is_physical = settlement_type.eq("Physical")
+
+    flags = pd.DataFrame({
+        "Product_subtype": deals["Product_subtype"],
+        "week": deals[period_col],
+        "num_deals": 1,
+        "deal_value": deals["deal_value_usd"],
+        "stp_yes": deals["Trade_capture_stp"].eq("Y"),
+        "num_unconfirmed": deals["Confirmation_flg"].eq("N"),
+        "num_unsettled": deals["_unsettled_bool"].astype(bool),
+        "cash_total": is_cash,
+        "cash_stp_yes": is_cash & settlement_stp_yes,
+        "physical_total": is_physical,
+        "physical_stp_yes": is_physical & settlement_stp_yes,
+    })
+
+    agg = flags.groupby(["Product_subtype", "week"], observed=True, sort=True).sum()
+    return agg[AGGREGATE_COLS].astype("float64")
+
+
+def _ratio_pct(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, num / den * 100.0, np.nan)
+
+
+def _wow_pct(mat: np.ndarray) -> np.ndarray:
+    # same semantics as Series.pct_change(): first week and x/0 -> NaN
+    out = np.full(mat.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[:, 1:] = (mat[:, 1:] / mat[:, :-1] - 1.0) * 100.0
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def _metric_values(agg: pd.DataFrame, keys, week_order, level: str) -> dict:
+    """GROUP_METRIC_ROWS name -> float64 array key x week from aggregates indexed by (level, week)."""
+    full_index = pd.MultiIndex.from_product([keys, week_order], names=[level, "week"])
+    agg = agg.reindex(full_index, fill_value=0.0)
+
+    shape = (len(keys), len(week_order))
+    m = {col: agg[col].to_numpy().reshape(shape) for col in AGGREGATE_COLS}
 
     return {
-        "equity": df_equity,
-        "fixedincome": df_fixedincome,
-        "repos": df_repos,
-        "fxspot": df_fxspot,
-        "derfx": df_derfx,
-        "dereq": df_dereq,
-        "derint": df_derint,
-        "dercr": df_dercr,
-        "margincalls": df_margincalls,
+        "Number of deals": m["num_deals"],
+        "Number of deals % change WoW": _wow_pct(m["num_deals"]),
+        "Deal value (in USD mn)": m["deal_value"] / 1_000_000,
+        "Deal value % change WoW": _wow_pct(m["deal_value"]),
+        "Trade capture STP %": _ratio_pct(m["stp_yes"], m["num_deals"]),
+        "Number of unconfirmed deals": m["num_unconfirmed"],
+        "Unconfirmed deals % change WoW": _wow_pct(m["num_unconfirmed"]),
+        "Number of unsettled deals": m["num_unsettled"],
+        "Unsettled deals % change WoW": _wow_pct(m["num_unsettled"]),
+        "Settlement cash STP %": _ratio_pct(m["cash_stp_yes"], m["cash_total"]),
+        "Settlement securities STP %": _ratio_pct(m["physical_stp_yes"], m["physical_total"]),
+        "Settlement STP %": _ratio_pct(m["cash_stp_yes"] + m["physical_stp_yes"],
+                                       m["cash_total"] + m["physical_total"]),
     }
 
-def run_analytics(cutoff_date_str: str = "2025-12-06"):
-    
-    raw = load_data()
+
+def metrics_from_aggregates(agg: pd.DataFrame, week_order) -> dict:
+    """
+    Turn (Product_subtype, week) aggregates into numeric metric matrices.
+    Returns (subtypes, dict: metric row name -> float64 array subtype x week).
+    """
+    subtypes = pd.Index(sorted(agg.index.get_level_values("Product_subtype").unique()), dtype=object)
+    values = _metric_values(agg, subtypes, week_order, "Product_subtype")
+
+    # settlement STP is not applicable to one side for some products
+    cash_only = subtypes.isin(list(CASH_ONLY_PRODUCTS))
+    physical_only = subtypes.isin(list(PHYSICAL_ONLY_PRODUCTS))
+    values["Settlement securities STP %"][cash_only, :] = np.nan
+    values["Settlement cash STP %"][physical_only, :] = np.nan
+
+    return subtypes, values
+
+
+def cube_from_aggregates(agg: pd.DataFrame, week_order, week_labels) -> pd.DataFrame:
+    """
+    Build the typed metrics cube from (Product_subtype, week) aggregates:
+    a float64 DataFrame indexed by (metric, Product_subtype) with one column
+    per week label. Missing or not-applicable values are NaN; deal value is
+    in USD mn.
+
+        metrics_cube.xs("Number of deals", level="metric")   # subtype x week
+        metrics_cube.xs("Bonds", level="Product_subtype")    # metric x week
+    """
+    subtypes, values = metrics_from_aggregates(agg, week_order)
+
+    data = np.concatenate([values[row] for row in METRIC_ROWS], axis=0)
+    index = pd.MultiIndex.from_product([METRIC_ROWS, subtypes], names=["metric", "Product_subtype"])
+    return pd.DataFrame(data, index=index, columns=week_labels, dtype="float64")
+
+
+def group_aggregates(agg: pd.DataFrame) -> pd.DataFrame:
+    """
+    (Product_subtype, week) aggregates summed to (Product_group, week) in
+    one grouped pass; subtypes outside GROUP_MAP are left out.
+    """
+    groups = agg.index.get_level_values("Product_subtype").map(SUBTYPE_GROUP).rename("Product_group")
+    return agg.groupby([groups, agg.index.get_level_values("week")], sort=False).sum()
+
+
+def group_cube_from_aggregates(agg: pd.DataFrame, week_order, week_labels) -> pd.DataFrame:
+    """
+    The metrics cube at product group level: indexed by (metric,
+    Product_group) in GROUP_NAMES order, the subtype cube rows plus the
+    combined "Settlement STP %" (GROUP_METRIC_ROWS). Counts and values are
+    group sums and the % rows are recomputed from the summed aggregates
+    (so trade capture STP is the deal-weighted average of the subtypes).
+    Empty when agg is.
+
+        group_metrics.xs("Number of deals", level="metric")   # group x week
+    """
+    groups = pd.Index(GROUP_NAMES if len(agg) else [], dtype=object)
+    values = _metric_values(group_aggregates(agg), groups, week_order, "Product_group")
+
+    data = np.concatenate([values[row] for row in GROUP_METRIC_ROWS], axis=0)
+    index = pd.MultiIndex.from_product([GROUP_METRIC_ROWS, groups], names=["metric", "Product_group"])
+    return pd.DataFrame(data, index=index, columns=week_labels, dtype="float64")
+
+
+def compute_metrics_cube(deals_4w: pd.DataFrame, week_order, week_labels) -> pd.DataFrame:
+    """Compute all eleven weekly metrics for every Product_subtype in one pass."""
+    return cube_from_aggregates(weekly_aggregates(deals_4w), week_order, week_labels)
+
+
+def cube_subproducts(metrics_cube: pd.DataFrame) -> list:
+    """Sorted Product_subtype values present in the metrics cube."""
+    return sorted(metrics_cube.index.get_level_values("Product_subtype").unique())
+
+
+def _format_value(row: str, x: float) -> str:
+    if row in COUNT_ROWS:
+        return f"{int(round(x)):d}"
+    if row == "Deal value (in USD mn)":
+        return f"{x:,.0f}"
+    # percentage rows: missing / not applicable -> "NA"
+    return "NA" if pd.isna(x) else f"{x:.1f}%"
+
+
+def format_metrics(metrics_cube: pd.DataFrame, sub_product: str, freq: str = "W") -> pd.DataFrame:
+    """
+    Build the display table for one sub_product from the numeric cube
+    (metric_rows(freq) x week labels, strings like "1,234", "12.5%" and
+    "NA"). Only call this at render time.
+    """
+    numeric = metrics_cube.xs(sub_product, level="Product_subtype").reindex(METRIC_ROWS)
+    metrics_df = pd.DataFrame(index=METRIC_ROWS, columns=numeric.columns, dtype="object")
+    for row in METRIC_ROWS:
+        metrics_df.loc[row] = [_format_value(row, x) for x in numeric.loc[row]]
+    metrics_df.index = metric_rows(freq)
+    return metrics_df
+
+
+def report_periods(as_of, window: int = 4, freq: str = "W") -> list:
+    """
+    The `window` consecutive periods ending with the one that contains
+    `as_of`, oldest first. freq: "W"/"weekly" (W-SUN weeks), "M"/"monthly"
+    or "Q"/"quarterly".
+    """
+    if freq not in PERIOD_FREQS:
+        raise ValueError(f"Unknown freq {freq!r}; expected one of {sorted(PERIOD_FREQS)}")
+    if window < 1:
+        raise ValueError(f"window must be >= 1, got {window}")
+    end = pd.Period(pd.to_datetime(as_of), freq=PERIOD_FREQS[freq])
+    return list(pd.period_range(end=end, periods=window, freq=PERIOD_FREQS[freq]))
+
+
+def period_label(p: pd.Period) -> str:
+    if p.freqstr.startswith("W"):
+        return f"{p.start_time.strftime('%d-%b')} to {p.end_time.strftime('%d-%b')}"
+    if p.freqstr.startswith("M"):
+        return p.strftime("%b-%Y")
+    return str(p)  # e.g. 2025Q4
+
+
+def raw_from_files(frames: dict) -> dict:
+    """
+    {source file name: typed frame} (e.g. from run_data_quality(keep_frames=True))
+    -> the load_data dict. Files not in `frames` are loaded as usual.
+    """
+    return {
+        key: frames[fname] if fname in frames else _read_source(fname)
+        for key, fname in SOURCE_KEYS.items()
+    }
+
+
+def _trade_dates(df: pd.DataFrame) -> pd.Series:
+    trade_date = df["Trade_date"]
+    if not pd.api.types.is_datetime64_any_dtype(trade_date):
+        trade_date = pd.to_datetime(trade_date, format=DATE_FMT, errors="coerce")
+    return trade_date
+
+
+def window_rows(df: pd.DataFrame, start, end) -> pd.DataFrame:
+    """Rows of a deal frame with a Trade_date in [start, end]."""
+    return df[_trade_dates(df).between(start, end)]
+
+
+def latest_trade_date(raw: dict = None):
+    """
+    Latest Trade_date over the deal frames of a load_data-style dict, or
+    (raw=None) over the newest week partition only. NaT when there is none.
+    """
+    if raw is None:
+        raw = read_partitions({k: SOURCE_KEYS[k] for k in DEAL_KEYS}, partition_weeks()[-1:])
+    dates = [_trade_dates(raw[k]).max() for k in DEAL_KEYS]
+    dates = [d for d in dates if pd.notna(d)]
+    return max(dates) if dates else pd.NaT
+
+
+def run_analytics(cutoff_date_str: str = DEFAULT_CUTOFF_DATE, as_of=AS_OF_LATEST, window: int = 4,
+                  freq: str = "W", raw: dict = None):
+    """
+    Weekly (or monthly / quarterly) metrics for the `window` periods ending
+    at `as_of`: a date, or AS_OF_LATEST (also None) for the latest
+    Trade_date in the data, falling back to the cutoff date when there is
+    none. cutoff_date_str drives the unsettled-deal logic. Only the rows of
+    that slice are kept (right after loading) and aggregated;
+    results["deals"] holds just those rows.
+
+    raw: optional load_data-style dict of already typed frames (see
+    raw_from_files); when given nothing is read from disk.
+    """
+    weekly = PERIOD_FREQS[freq] == "W-SUN"
+
+    # partitioned layout: read only the week partitions overlapping the
+    # window (the latest date comes from the newest partition); otherwise
+    # load the full files
+    partitioned = raw is None and partitions_available()
+    if raw is not None:
+        raw = dict(raw)
+    elif not partitioned:
+        raw = load_data()
+    if as_of is None or as_of == AS_OF_LATEST:
+        latest = latest_trade_date(raw)
+        as_of = cutoff_date_str if pd.isna(latest) else latest
+    periods = report_periods(as_of, window, freq)
+    start, end = periods[0].start_time, periods[-1].end_time
+    if partitioned:
+        weeks = [w for w in partition_weeks() if w.end_time >= start and w.start_time <= end]
+        raw = load_data(weeks=weeks)
+    date_parse_failures = date_parse_report(raw)
+
+    # everything below (concat, dates, flags) runs on the window rows only;
+    # the filtered frames are new objects, so adding columns is safe
+    for key in DEAL_KEYS:
+        raw[key] = window_rows(raw[key], start, end)
 
     df_equity     = raw["equity"]
     df_fixedincome = raw["fixedincome"]
@@ -92,7 +490,7 @@ def run_analytics(cutoff_date_str: str = "2025-12-06"):
         df_derint,
         df_dercr,
     ]
-    deals = pd.concat(deal_dfs, ignore_index=True)
+    deals = concat_typed(deal_dfs)
 
     # ---- Date handling ----
     cols = [
@@ -107,7 +505,13 @@ def run_analytics(cutoff_date_str: str = "2025-12-06"):
         "Maturity_date_fut",
         "Maturity_date_fra",
     ]
-    deals[cols] = deals[cols].apply(pd.to_datetime, errors="coerce")
+    # dates were parsed once per file, with the registry formats, at load /
+    # cache time; only a column that arrives unparsed is converted here
+    for col in cols:
+        if col not in deals.columns:
+            deals[col] = pd.NaT
+        elif not pd.api.types.is_datetime64_any_dtype(deals[col]):
+            deals[col] = pd.to_datetime(deals[col], format=DATE_FMT, errors="coerce")
 
     # Week bucket
     deals["week"] = deals["Trade_date"].dt.to_period("W-SUN")
@@ -120,214 +524,21 @@ def run_analytics(cutoff_date_str: str = "2025-12-06"):
         & deals["Settlement_date"].lt(cutoff_date)
     )
 
-    # ---- Filter to last 4 weeks ----
-    all_weeks = sorted(deals["week"].dropna().unique())
-    last_weeks = all_weeks[-4:] if len(all_weeks) >= 4 else all_weeks
-    deals_4w = deals[deals["week"].isin(last_weeks)].copy()
-
-    week_order = sorted(deals_4w["week"].unique())
-    #week_labels = [str(w) for w in week_order]
-    week_labels = [
-    f"{w.start_time.strftime('%d-%b')} to {w.end_time.strftime('%d-%b')}"
-    for w in week_order
-    ]
-
-    subproduct_metrics = {}  # dict: sub_product -> metrics_df
-
-    # ---- Loop over Product_subtype ----
-    for sp, df_sp in deals_4w.groupby("Product_subtype"):
-        g = df_sp.groupby("week")
-
-        # core weekly metrics
-        num_deals = g.size().reindex(week_order, fill_value=0).astype(float)
-
-        deal_value = (
-            g["deal_value_usd"]
-            .sum(min_count=1)
-            .reindex(week_order)
-            .fillna(0.0)
-        )
-
-        stp_yes = (
-            g["Trade_capture_stp"]
-            .apply(lambda s: (s == "Y").sum())
-            .reindex(week_order, fill_value=0)
-        )
-        stp_total = g["Trade_capture_stp"].size().reindex(week_order, fill_value=0)
-        trade_capture_stp_pct = np.where(
-            stp_total > 0,
-            stp_yes / stp_total * 100.0,
-            np.nan,
-        )
-
-        num_unconfirmed = (
-            g["Confirmation_flg"]
-            .apply(lambda s: (s == "N").sum())
-            .reindex(week_order, fill_value=0)
-            .astype(float)
-        )
-
-        num_unsettled = (
-            g["_unsettled_bool"]
-            .sum()
-            .reindex(week_order, fill_value=0)
-            .astype(float)
-        )
-
-        # settlement STP by type
-        def stp_pct_for_type(df_group, settlement_type_value):
-            subset = df_group[df_group["Settlement_type"] == settlement_type_value]
-            if subset.empty:
-                return np.nan
-            total = len(subset)
-            stp_yes_local = (subset["Settlement_stp"] == "Y").sum()
-            return (stp_yes_local / total) * 100.0
-
-        cash_stp_pct = []
-        sec_stp_pct = []
-        for w in week_order:
-            df_w = df_sp[df_sp["week"] == w]
-            cash_stp_pct.append(stp_pct_for_type(df_w, "Cash"))
-            sec_stp_pct.append(stp_pct_for_type(df_w, "Physical"))
-
-        cash_stp_pct = pd.Series(cash_stp_pct, index=week_order, dtype="float64")
-        sec_stp_pct = pd.Series(sec_stp_pct, index=week_order, dtype="float64")
-
-        # WoW % changes
-        num_deals_pct_chg = (
-            num_deals.pct_change().replace([np.inf, -np.inf], np.nan) * 100
-        )
-        deal_value_pct_chg = (
-            deal_value.pct_change().replace([np.inf, -np.inf], np.nan) * 100
-        )
-        num_unconfirmed_pct_chg = (
-            num_unconfirmed.pct_change().replace([np.inf, -np.inf], np.nan) * 100
-        )
-        num_unsettled_pct_chg = (
-            num_unsettled.pct_change().replace([np.inf, -np.inf], np.nan) * 100
-        )
-
-        # assemble metrics_df for this sub_product
-        metrics_df = pd.DataFrame(
-            index=[
-                "Number of deals",
-                "Number of deals % change WoW",
-                "Deal value (in USD mn)",
-                "Deal value % change WoW",
-                "Trade capture STP %",
-                "Number of unconfirmed deals",
-                "Unconfirmed deals % change WoW",
-                "Number of unsettled deals",
-                "Unsettled deals % change WoW",
-                "Settlement cash STP %",
-                "Settlement securities STP %",
-            ],
-            columns=week_labels,
-            dtype="object",
-        )
-
-        for i, w in enumerate(week_order):
-            col = week_labels[i]
-            metrics_df.loc["Number of deals", col] = num_deals.loc[w]
-            metrics_df.loc["Number of deals % change WoW", col] = num_deals_pct_chg.loc[
-                w
-            ]
-            metrics_df.loc["Deal value (in USD mn)", col] = deal_value.loc[w]
-            metrics_df.loc["Deal value % change WoW", col] = deal_value_pct_chg.loc[w]
-            metrics_df.loc["Trade capture STP %", col] = trade_capture_stp_pct[i]
-            metrics_df.loc["Number of unconfirmed deals", col] = num_unconfirmed.loc[w]
-            metrics_df.loc["Unconfirmed deals % change WoW", col] = (
-                num_unconfirmed_pct_chg.loc[w]
-            )
-            metrics_df.loc["Number of unsettled deals", col] = num_unsettled.loc[w]
-            metrics_df.loc["Unsettled deals % change WoW", col] = (
-                num_unsettled_pct_chg.loc[w]
-            )
-            metrics_df.loc["Settlement cash STP %", col] = cash_stp_pct.loc[w]
-            metrics_df.loc["Settlement securities STP %", col] = sec_stp_pct.loc[w]
-
-        # format: counts as integers
-        count_rows = [
-            "Number of deals",
-            "Number of unconfirmed deals",
-            "Number of unsettled deals",
-        ]
-        for row in count_rows:
-            metrics_df.loc[row] = metrics_df.loc[row].apply(
-                lambda x: "" if pd.isna(x) else f"{int(round(float(x))):d}"
-            )
-
-        # percentages rows
-        pct_rows = [
-            "Trade capture STP %",
-            "Settlement cash STP %",
-            "Settlement securities STP %",
-            "Number of deals % change WoW",
-            "Deal value % change WoW",
-            "Unconfirmed deals % change WoW",
-            "Unsettled deals % change WoW",
-        ]
-        for row in pct_rows:
-            metrics_df.loc[row] = metrics_df.loc[row].apply(
-                lambda x: "" if pd.isna(x) or x == "" else f"{float(x):.1f}%"
-            )
-
-        # deal value convert to USD mn (no decimals)
-        for col in metrics_df.columns:
-            val = metrics_df.at["Deal value (in USD mn)", col]
-            if val == "" or pd.isna(val):
-                continue
-            val_mn = float(val) / 1_000_000
-            metrics_df.at["Deal value (in USD mn)", col] = f"{val_mn:,.0f}"
-
-        subproduct_metrics[sp] = metrics_df
-
-    # rules for cash-only / physical-only products
-    physical_only_products = {
-        "Cash Equity",
-        "Bonds",
-        "NCD",
-        "Secured Notes",
-        "Repo",
-        "ReverseRepo",
-        "Forex-Spot",
-        "FxForwards",
-        "FxFutures",
-    }
+    # ---- Filter to the report window ----
+    if weekly:
+        period_col = "week"
+    else:
+        period_col = "period"
+        deals["period"] = deals["Trade_date"].dt.to_period(PERIOD_FREQS[freq])
+    # rows of the report window (key kept as deals_4w for chart callers)
+    deals_4w = deals[deals[period_col].isin(periods)].copy()
 
-    cash_only_products = {
-        "FxSwaps",
-        "IntRateSwaps",
-        "IntRateFRA",
-    }
+    week_order = periods
+    week_labels = [period_label(p) for p in week_order]
 
-    for sub_product, df in subproduct_metrics.items():
-        if sub_product in cash_only_products:
-            df.loc["Settlement securities STP %"] = "NA"
-
-        if sub_product in physical_only_products:
-            df.loc["Settlement cash STP %"] = "NA"
-
-        df.loc["Settlement cash STP %"] = df.loc["Settlement cash STP %"].apply(
-            lambda x: "NA" if (pd.isna(x) or x == "") else x
-        )
-        df.loc["Settlement securities STP %"] = df.loc[
-            "Settlement securities STP %"
-        ].apply(lambda x: "NA" if (pd.isna(x) or x == "") else x)
-
-    wow_pct_rows = {
-        "Trade capture STP %",
-        "Number of deals % change WoW",
-        "Deal value % change WoW",
-        "Unconfirmed deals % change WoW",
-        "Unsettled deals % change WoW",
-    }
-    for sub_product, df in subproduct_metrics.items():
-        for row in wow_pct_rows:
-            if row in df.index:
-                df.loc[row] = df.loc[row].apply(
-                    lambda x: "NA" if (pd.isna(x) or x == "" or x == "nan") else x
-                )
+    agg_window = weekly_aggregates(deals_4w, period_col=period_col)
+    metrics_cube = cube_from_aggregates(agg_window, week_order, week_labels)
+    group_metrics = group_cube_from_aggregates(agg_window, week_order, week_labels)
 
     # return all key outputs for app.py / charts
     return {
@@ -335,6 +546,11 @@ def run_analytics(cutoff_date_str: str = "2025-12-06"):
         "deals_4w": deals_4w,
         "week_order": week_order,
         "week_labels": week_labels,
-        "subproduct_metrics": subproduct_metrics,
+        "metrics_cube": metrics_cube,
+        "group_metrics": group_metrics,
         "df_margincalls": df_margincalls,
+        "date_parse_failures": date_parse_failures,
+        "as_of": as_of,
+        "window": window,
+        "freq": freq,
     }
@@ -21,22 +21,12 @@ def pct_change_matrix(mat: pd.DataFrame) -> pd.DataFrame:
     res = res.replace([np.inf, -np.inf], np.nan)
     return res
 
-def plot_disputed_margin_calls(df_margincalls: pd.DataFrame, last_n_weeks: int = 4):
-
-    # ---------------------------
-    # 0. Basic validation
-    # ---------------------------
-    if df_margincalls is None or df_margincalls.empty:
-        fig1, ax1 = plt.subplots(figsize=(8, 4))
-        ax1.text(0.5, 0.5, "No margin call data", ha="center", va="center")
-        ax1.axis("off")
-
-        fig2, ax2 = plt.subplots(figsize=(8, 4))
-        ax2.text(0.5, 0.5, "No margin call data", ha="center", va="center")
-        ax2.axis("off")
-
-        return fig1, fig2
-
+def disputed_weekly(df_margincalls: pd.DataFrame, last_n_weeks: int = 4):
+    """
+    Disputed margin calls of the last `last_n_weeks` weeks that have any.
+    Returns (last_weeks, counts, amounts): counts / amounts (USD) are
+    Margin_type x week frames; last_weeks is [] when there are none.
+    """
     df = df_margincalls.copy()
 
     # Convert date string to datetime
@@ -46,44 +36,58 @@ def plot_disputed_margin_calls(df_margincalls: pd.DataFrame, last_n_weeks: int =
     disputed_states = ["Disputed"]  # e.g. ["Disputed", "Challenged"]
     df_dispute = df[df["Call_result"].isin(disputed_states)].copy()
 
-    if df_dispute.empty:
-        fig1, ax1 = plt.subplots(figsize=(8, 4))
-        ax1.text(0.5, 0.5, "No disputed margin calls", ha="center", va="center")
-        ax1.axis("off")
+    # Create week period (week ending Sunday; change to W-MON if needed)
+    df_dispute["week"] = df_dispute["Call_date_dt"].dt.to_period("W-SUN")
 
-        fig2, ax2 = plt.subplots(figsize=(8, 4))
-        ax2.text(0.5, 0.5, "No disputed margin calls", ha="center", va="center")
-        ax2.axis("off")
+    # Keep last weeks that actually have disputes
+    weeks_all = sorted(df_dispute["week"].dropna().unique())
+    last_weeks = weeks_all[-last_n_weeks:]
+    df_dispute = df_dispute[df_dispute["week"].isin(last_weeks)]
 
-        return fig1, fig2
+    # Counts
+    counts = (
+        df_dispute
+        .groupby(["Margin_type", "week"])
+        .size()
+        .unstack("week", fill_value=0)
+        .reindex(columns=last_weeks, fill_value=0)
+    )
 
-    # Create week period (week ending Sunday; change to W-MON if needed)
-    df_dispute["week"] = df_dispute["Call_date_dt"].dt.to_period("W-SUN")
+    # Amounts
+    amounts = (
+        df_dispute
+        .groupby(["Margin_type", "week"])["Call_amount"]
+        .sum()
+        .unstack("week", fill_value=0.0)
+        .reindex(columns=last_weeks, fill_value=0.0)
+    )
+    return last_weeks, counts, amounts
 
-    # Keep last 4 weeks that actually have disputes
-    weeks_all = sorted(df_dispute["week"].unique())
+def plot_disputed_margin_calls(df_margincalls: pd.DataFrame, last_n_weeks: int = 4):
 
-    if not weeks_all:
+    # ---------------------------
+    # 0. Basic validation
+    # ---------------------------
+    if df_margincalls is None or df_margincalls.empty:
         fig1, ax1 = plt.subplots(figsize=(8, 4))
-        ax1.text(0.5, 0.5, "No disputed weeks", ha="center", va="center")
+        ax1.text(0.5, 0.5, "No margin call data", ha="center", va="center")
         ax1.axis("off")
 
         fig2, ax2 = plt.subplots(figsize=(8, 4))
-        ax2.text(0.5, 0.5, "No disputed weeks", ha="center", va="center")
+        ax2.text(0.5, 0.5, "No margin call data", ha="center", va="center")
         ax2.axis("off")
 
         return fig1, fig2
 
-    last_weeks = weeks_all[-4:]
-    df_dispute = df_dispute[df_dispute["week"].isin(last_weeks)].copy()
+    last_weeks, counts, amounts = disputed_weekly(df_margincalls, last_n_weeks)
 
-    if df_dispute.empty:
+    if not last_weeks:
         fig1, ax1 = plt.subplots(figsize=(8, 4))
-        ax1.text(0.5, 0.5, "No disputed calls in last weeks", ha="center", va="center")
+        ax1.text(0.5, 0.5, "No disputed margin calls", ha="center", va="center")
         ax1.axis("off")
 
         fig2, ax2 = plt.subplots(figsize=(8, 4))
-        ax2.text(0.5, 0.5, "No disputed calls in last weeks", ha="center", va="center")
+        ax2.text(0.5, 0.5, "No disputed margin calls", ha="center", va="center")
         ax2.axis("off")
 
         return fig1, fig2
@@ -95,27 +99,6 @@ def plot_disputed_margin_calls(df_margincalls: pd.DataFrame, last_n_weeks: int =
     for w in last_weeks
         ]
 
-    # ---------------------------
-    # 2. Aggregations: counts and amounts by Margin_type x week
-    # ---------------------------
-
-    # Counts
-    counts = (
-        df_dispute
-        .groupby(["Margin_type", "week"])
-        .size()
-        .unstack("week", fill_value=0)
-        .reindex(columns=last_weeks, fill_value=0)
-    )
-
-    # Amounts
-    amounts = (
-        df_dispute
-        .groupby(["Margin_type", "week"])["Call_amount"]
-        .sum()
-        .unstack("week", fill_value=0.0)
-        .reindex(columns=last_weeks, fill_value=0.0)
-    )
     amounts_mn = amounts / 1_000_000
     margin_types = list(counts.index)
     num_types = len(margin_types)
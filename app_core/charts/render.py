@@ -0,0 +1,76 @@
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from pathlib import Path
+import multiprocessing
+import os
+
+# ---- Chart rendering stage ----
+# The report charts rendered to PNG files, one job per plot function, in a
+# process pool (each worker on the Agg backend). Every figure is closed as
+# soon as it is saved, so neither the workers nor the caller accumulate
+# figures. Paths come back in CHART_JOBS order whatever finishes first.
+# Workers are spawned, not forked: the callers (Streamlit server, agents with
+# the mailer thread) are multi-threaded, and a forked child can inherit a
+# lock held by another thread and deadlock on it.
+
+# (module, plot function, positional result keys, keyword -> result key, output file per returned figure)
+CHART_JOBS = [
+    ("app_core.charts.num_deals_chart", "plot_deal_volumes", ["group_metrics"], {},
+     ["chart1_volumes.png"]),
+    ("app_core.charts.val_deals_chart", "plot_deal_value", ["group_metrics"], {},
+     ["chart2_values.png"]),
+    ("app_core.charts.trade_cap_stp_chart", "plot_trade_cap_stp", ["group_metrics"], {},
+     ["chart3_tradecap.png"]),
+    ("app_core.charts.settlement_stp_chart", "plot_settlement_stp", ["group_metrics"], {},
+     ["chart4_settlement.png"]),
+    ("app_core.charts.unconfirmed_deals_chart", "plot_deals_unconfirmed", ["group_metrics"], {},
+     ["chart5_breaks_counts.png"]),
+    ("app_core.charts.unsettled_deals_chart", "plot_deals_unsettled", ["group_metrics"], {},
+     ["chart6_breaks_amounts.png"]),
+    ("app_core.charts.disputed_margin_calls_chart", "plot_disputed_margin_calls", ["df_margincalls"], {},
+     ["chart7_disc_counts.png", "chart8_disc_amounts.png"]),
+]
+
+
+def render_job(job, args, kwargs, out_dir: Path, dpi=None) -> list:
+    """Run one plot function, save its figure(s) to out_dir and close them."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    module, func, _, _, files = job
+    figs = getattr(import_module(module), func)(*args, **kwargs)
+    figs = figs if isinstance(figs, tuple) else (figs,)
+    paths = []
+    try:
+        for fig, fname in zip(figs, files):
+            path = Path(out_dir) / fname
+            fig.savefig(path, bbox_inches="tight", **({"dpi": dpi} if dpi else {}))
+            paths.append(str(path))
+    finally:
+        for fig in figs:
+            plt.close(fig)
+    return paths
+
+
+def render_charts(results, out_dir: Path, workers: int = None, jobs=CHART_JOBS, dpi=None) -> list:
+    """
+    Render the report charts of run_analytics `results` as PNGs in out_dir.
+    Returns the image paths in `jobs` order. workers <= 1 renders in this
+    process; otherwise each job gets only the result frames it plots.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    def job_inputs(job):
+        _, _, arg_keys, kw_keys, _ = job
+        return [results[k] for k in arg_keys], {kw: results.get(k) for kw, k in kw_keys.items()}
+
+    if workers <= 1:
+        per_job = [render_job(job, *job_inputs(job), out_dir, dpi) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(render_job, job, *job_inputs(job), out_dir, dpi) for job in jobs]
+            per_job = [f.result() for f in futures]
+    return [path for paths in per_job for path in paths]
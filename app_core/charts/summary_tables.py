@@ -0,0 +1,116 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import multiprocessing
+import os
+import numpy as np
+import pandas as pd
+
+# ---- Summary tables for every product subtype ----
+# One page template per worker: figure, row labels and grid are laid out and
+# drawn once as a background; for each page only the title, the column
+# headers and the value texts (animated artists) are redrawn over a copy of
+# it. Plain texts at fixed positions plus blitting keep a page far cheaper
+# than an ax.table figure. A page holds at most PAGE_COLS periods; longer
+# windows continue on the next page(s). Subtypes are split over a spawned
+# process pool (Agg backend; not forked, the callers are multi-threaded) and
+# the pages are combined, in cube_subproducts order, into one PDF.
+
+PAGE_FIGSIZE = (11, 6)
+PAGE_DPI = 100
+PAGE_COLS = 4
+# figure fractions: left edge, row label column, value columns, header top, row height
+X0, LABEL_W, COL_W = 0.04, 0.36, 0.15
+TOP, ROW_H = 0.86, 0.07
+
+
+def _page_template(row_labels, n_cols: int = PAGE_COLS):
+    """(figure, title text, [header text per column], [[value text per column] per row]) for one table page."""
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    fig = plt.figure(figsize=PAGE_FIGSIZE)
+    title = fig.text(X0, 0.93, "", fontsize=14, fontweight="bold")
+    right = [X0 + LABEL_W + COL_W * (k + 1) - 0.01 for k in range(n_cols)]
+    centers = [TOP - ROW_H * (i + 0.5) for i in range(len(row_labels) + 1)]
+
+    headers = [fig.text(x, centers[0], "", ha="right", va="center", fontsize=10, fontweight="bold") for x in right]
+    for y, label in zip(centers[1:], row_labels):
+        fig.text(X0 + 0.005, y, label, va="center", fontsize=10)
+    rules = [[(X0, TOP - ROW_H * i), (X0 + LABEL_W + COL_W * n_cols, TOP - ROW_H * i)]
+             for i in range(len(row_labels) + 2)]
+    fig.add_artist(LineCollection(rules, colors="0.6", linewidths=0.6, transform=fig.transFigure))
+
+    cells = [[fig.text(x, y, "", ha="right", va="center", fontsize=10) for x in right] for y in centers[1:]]
+    return fig, title, headers, cells
+
+
+def render_table_pages(metrics_cube: pd.DataFrame, sub_products, dpi: int = PAGE_DPI, freq: str = "W") -> list:
+    """
+    [((n, k), (width, height), RGB bytes)] of the format_metrics table of
+    each (n, sub product); k numbers its pages of PAGE_COLS periods.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from app_core.analytics import format_metrics, metric_rows
+
+    columns = list(metrics_cube.columns)
+    spans = [range(i, min(i + PAGE_COLS, len(columns))) for i in range(0, len(columns), PAGE_COLS)]
+    n_cols = min(PAGE_COLS, len(columns))
+    fig, title, headers, cells = _page_template(metric_rows(freq), n_cols)
+    dynamic = [title] + headers + [cell for row in cells for cell in row]
+    for artist in dynamic:
+        artist.set_animated(True)  # left out of the background
+    fig.set_dpi(dpi)
+    canvas = fig.canvas
+    pages = []
+    try:
+        canvas.draw()
+        background = canvas.copy_from_bbox(fig.bbox)
+        for n, sub_product in sub_products:
+            table = format_metrics(metrics_cube, sub_product, freq).to_numpy()
+            for k, span in enumerate(spans):
+                part = f" ({k + 1}/{len(spans)})" if len(spans) > 1 else ""
+                title.set_text(f"Weekly Metrics — {sub_product}{part}")
+                for j, header in enumerate(headers):
+                    header.set_text(columns[span[j]] if j < len(span) else "")
+                for row_cells, values in zip(cells, table):
+                    for j, cell in enumerate(row_cells):
+                        cell.set_text(values[span[j]] if j < len(span) else "")
+                canvas.restore_region(background)
+                for artist in dynamic:
+                    fig.draw_artist(artist)
+                rgba = np.asarray(canvas.buffer_rgba())
+                pages.append(((n, k), canvas.get_width_height(), rgba[..., :3].tobytes()))
+    finally:
+        plt.close(fig)
+    return pages
+
+
+def render_summary_pdf(metrics_cube: pd.DataFrame, out_path: Path, workers: int = None, dpi: int = PAGE_DPI,
+                       freq: str = "W"):
+    """
+    The summary tables of all subtypes as pages of one PDF at out_path (None
+    when the cube is empty). workers > 1 renders the pages in a process pool;
+    freq is the run_analytics frequency (labels of the "% change" rows).
+    """
+    from PIL import Image
+    from app_core.analytics import cube_subproducts
+
+    if metrics_cube is None or metrics_cube.empty:
+        return None
+    numbered = list(enumerate(cube_subproducts(metrics_cube)))
+    workers = min(workers or os.cpu_count() or 1, len(numbered))
+    if workers <= 1:
+        pages = render_table_pages(metrics_cube, numbered, dpi, freq)
+    else:
+        chunks = [numbered[k::workers] for k in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(render_table_pages, metrics_cube, chunk, dpi, freq) for chunk in chunks]
+            pages = sorted(page for f in futures for page in f.result())
+
+    images = [Image.frombytes("RGB", size, data) for _, size, data in pages]
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    images[0].save(out_path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+    return out_path
@@ -11,65 +11,29 @@ plt.rcParams.update({
     "legend.fontsize": 12
 })
 
-# 1. Define grouping: group name -> list of sub_product keys (must match subproduct_metrics keys)
-group_map = {
-    "Cash Equity": ["Cash Equity"],
-    "Fixed Income": ["Bonds", "NCD", "Secured Notes"],
-    "Repos": ["Repo", "ReverseRepo"],
-    "Equity Derivatives": ["EqFutures", "EqOptions", "EqSwaps", "IndFutures", "IndOptions"],
-    "Forex Spot & Derivatives": ["Forex-Spot", "FxForwards", "FxFutures", "FxOptions", "FxSwaps"],
-    "Int Rate Derivatives": ["IntRateFRA", "IntRateOptions", "IntRateSwaps"],
-    "Credit Derivatives": ["CDS", "TRS"],
-}
 
-# 2. Helper to parse "Number of deals" row values (handles numeric or formatted strings)
-def parse_count(x):
-    if x is None or (isinstance(x, float) and np.isnan(x)):
-        return 0.0
-    s = str(x).strip()
-    if s == "" or s.upper() == "NA":
-        return 0.0
-    s = s.replace(",", "")  # in case of "1,234"
-    return float(s)
-def plot_deals_unconfirmed(subproduct_metrics: dict):
+def plot_deals_unconfirmed(group_metrics: pd.DataFrame):
 
-    if not subproduct_metrics:
+    if group_metrics is None or group_metrics.empty:
         # Return an empty figure rather than crashing
         fig, ax = plt.subplots(figsize=(8, 4))
         ax.text(0.5, 0.5, "No data available", ha="center", va="center")
         ax.axis("off")
         return fig
 
-    # 3. Get week columns from any sub-product dataframe
-    sample_df = next(iter(subproduct_metrics.values()))
-    week_cols = list(sample_df.columns)      # 4 weeks
+    # 3. Week columns and the group x week rows of run_analytics()["group_metrics"]
+    week_cols = list(group_metrics.columns)      # 4 weeks
+    metric = group_metrics.xs("Number of unconfirmed deals", level="metric")
     num_weeks = len(week_cols)
 
-    group_names = list(group_map.keys())
+    group_names = list(metric.index)
     num_groups = len(group_names)
 
-    # 4. Build matrix of counts: shape (num_groups, num_weeks)
-    counts = np.zeros((num_groups, num_weeks))
+    # 4. Group totals: shape (num_groups, num_weeks)
+    counts = metric.to_numpy()
 
-    for gi, gname in enumerate(group_names):
-        for sp in group_map[gname]:
-            if sp not in subproduct_metrics:
-                continue  # in case a sub-product has no data
-            df_sp = subproduct_metrics[sp]
-            row = df_sp.loc["Number of unconfirmed deals", week_cols]
-            vals = row.apply(parse_count).values
-            counts[gi, :] += vals
-
-    # 5. Compute WoW % change for each group (based on aggregated counts)
-    wow_pct = np.full((num_groups, num_weeks), np.nan)
-    for gi in range(num_groups):
-        for wi in range(1, num_weeks):  # weeks 1,2,3 vs previous
-            prev = counts[gi, wi - 1]
-            curr = counts[gi, wi]
-            if prev > 0:
-                wow_pct[gi, wi] = (curr - prev) / prev * 100.0
-            else:
-                wow_pct[gi, wi] = np.nan  # undefined if previous week was 0
+    # 5. WoW % change of the group totals (NaN if previous week was 0)
+    wow_pct = group_metrics.xs("Unconfirmed deals % change WoW", level="metric").to_numpy()
 
     # 6. Plot grouped bar chart (4 bars per group)
     x = np.arange(num_groups)  # group positions
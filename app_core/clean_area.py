@@ -0,0 +1,157 @@
+from pathlib import Path
+import json
+import os
+import pandas as pd
+from app_core.data_cache import DATA_DIR, HAVE_PARQUET
+from app_core.schema import normalize_dates, schema_hash
+
+# ---- Clean / quarantine areas written by the data quality step ----
+# In quarantine mode run_data_quality leaves data/df_*.csv untouched and writes
+#   data/clean/<stem>.parquet       accepted rows, schema columns typed
+#   data/quarantine/<stem>.csv      rejected rows + dq_reason codes
+#   data/clean/_manifest.json       per file: source sha256, counts, ...
+# An input whose sha256 matches the manifest is not validated again.
+# load_data reads the clean Parquet files when they are present.
+
+CLEAN_VERSION = 1
+CLEAN_DIR = DATA_DIR / "clean"
+QUARANTINE_DIR = DATA_DIR / "quarantine"
+MANIFEST_FILE = "_manifest.json"
+REASON_COL = "dq_reason"
+
+
+def clean_path(fname: str, clean_dir: Path = CLEAN_DIR) -> Path:
+    return clean_dir / f"{Path(fname).stem}.parquet"
+
+
+def quarantine_path(fname: str, quarantine_dir: Path = QUARANTINE_DIR) -> Path:
+    return quarantine_dir / fname
+
+
+def read_manifest(clean_dir: Path = CLEAN_DIR) -> dict:
+    """dict: source file name -> entry (sha256, schema, counts, date parse failures)."""
+    path = clean_dir / MANIFEST_FILE
+    if not path.exists():
+        return {}
+    try:
+        manifest = json.loads(path.read_text())
+    except ValueError:
+        return {}
+    return manifest.get("files", {}) if manifest.get("version") == CLEAN_VERSION else {}
+
+
+def write_manifest(files: dict, clean_dir: Path = CLEAN_DIR):
+    clean_dir.mkdir(parents=True, exist_ok=True)
+    tmp = clean_dir / f"{MANIFEST_FILE}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps({"version": CLEAN_VERSION, "files": files}, indent=1, sort_keys=True))
+    os.replace(tmp, clean_dir / MANIFEST_FILE)
+
+
+def entry_is_current(fname: str, entry, sha256: str, schema: dict, clean_dir: Path = CLEAN_DIR,
+                     quarantine_dir: Path = QUARANTINE_DIR) -> bool:
+    """True when the outputs recorded in `entry` were built from this input and still exist."""
+    return (
+        entry is not None
+        and entry.get("sha256") == sha256
+        and entry.get("schema") == schema_hash(schema)
+        and clean_path(fname, clean_dir).exists()
+        and (entry.get("rejected", 0) == 0 or quarantine_path(fname, quarantine_dir).exists())
+    )
+
+
+def _arrow_schema(chunk: pd.DataFrame, schema: dict):
+    """Arrow types for a typed chunk: schema amounts/dates typed, rest strings."""
+    import pyarrow as pa
+
+    fields = []
+    for col in chunk.columns:
+        if col in schema["dates"]:
+            fields.append(pa.field(col, pa.from_numpy_dtype(chunk[col].dtype)))
+        elif schema["columns"].get(col) == "float64":
+            fields.append(pa.field(col, pa.float64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+class CleanWriter:
+    """
+    Streams accepted (text) chunks of one source file into its clean Parquet
+    file: schema amount columns become float64 and schema dates are parsed
+    with their fixed format; other columns stay text. Date parse failures are
+    summed over chunks. Written to a temp file, moved into place on close().
+    """
+
+    def __init__(self, fname: str, schema: dict, clean_dir: Path = CLEAN_DIR):
+        if not HAVE_PARQUET:
+            raise RuntimeError("The clean area needs pyarrow (pip install pyarrow)")
+        clean_dir.mkdir(parents=True, exist_ok=True)
+        self.schema = schema
+        self.target = clean_path(fname, clean_dir)
+        self.tmp = self.target.with_name(f"{self.target.name}.{os.getpid()}.tmp")
+        self.date_parse_failures = {}
+        self._writer = None
+        self._arrow = None
+
+    def write(self, chunk: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        chunk = chunk.copy()
+        for col, dtype in self.schema["columns"].items():
+            if dtype == "float64" and col in chunk.columns:
+                chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+        failures = normalize_dates(chunk, self.schema["dates"])
+        for col, n in failures.items():
+            self.date_parse_failures[col] = self.date_parse_failures.get(col, 0) + n
+
+        if self._writer is None:
+            self._arrow = _arrow_schema(chunk, self.schema)
+            self._writer = pq.ParquetWriter(self.tmp, self._arrow)
+        self._writer.write_table(pa.Table.from_pandas(chunk, schema=self._arrow, preserve_index=False))
+
+    def close(self, columns=None):
+        """Finish the file; `columns` (the CSV header) is used if no chunk was written."""
+        if self._writer is None:
+            self.write(pd.DataFrame({c: pd.Series(dtype="str") for c in columns or []}))
+        self._writer.close()
+        os.replace(self.tmp, self.target)
+        return self.target
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self.tmp.exists():
+            self.tmp.unlink()
+
+
+def clean_available(fname: str, source: Path, clean_dir: Path = CLEAN_DIR) -> bool:
+    """
+    True when a clean file exists for `fname` and was built from the current
+    source file (same size and mtime as recorded; no content read).
+    """
+    if not HAVE_PARQUET or not clean_path(fname, clean_dir).exists():
+        return False
+    entry = read_manifest(clean_dir).get(fname)
+    if entry is None or not source.exists():
+        return False
+    stat = source.stat()
+    return entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size
+
+
+def read_clean(fname: str, schema: dict, clean_dir: Path = CLEAN_DIR) -> pd.DataFrame:
+    """
+    Read the schema columns of a clean file with the same dtypes as
+    schema.read_source_csv; date parse failures come from the manifest.
+    """
+    import pyarrow.parquet as pq
+
+    path = clean_path(fname, clean_dir)
+    columns = schema["columns"]
+    wanted = set(columns) | set(schema["dates"])
+    file_order = [c for c in pq.read_schema(path).names if c in wanted]  # as in the CSV
+    df = pd.read_parquet(path, columns=file_order).astype(columns)
+    entry = read_manifest(clean_dir).get(fname, {})
+    df.attrs["date_parse_failures"] = entry.get("date_parse_failures", {})
+    return df
+
@@ -0,0 +1,118 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import pandas as pd
+from app_core.schema import read_source_csv, schema_hash
+
+# this file is in: my-streamlit-app/app_core/data_cache.py
+BASE_DIR = Path(__file__).resolve().parents[1]  # -> my-streamlit-app/
+# IB_DATA_DIR points the app at another dataset (e.g. a scaled benchmark set)
+DATA_DIR = Path(os.environ.get("IB_DATA_DIR", BASE_DIR / "data"))
+CACHE_DIR = DATA_DIR / ".cache"
+
+# bump when the parsing below changes, so old cache files are rebuilt
+CACHE_VERSION = 3
+
+try:
+    import pyarrow  # noqa: F401  (parquet engine)
+    HAVE_PARQUET = True
+except ImportError:
+    HAVE_PARQUET = False
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_atomic(df: pd.DataFrame, target: Path):
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+
+
+def read_csv_cached(path: Path, schema: dict, cache_dir: Path = CACHE_DIR) -> pd.DataFrame:
+    """
+    Read a source CSV through a typed Parquet cache.
+
+    The first read parses the CSV with its registry schema (projected columns,
+    explicit dtypes, parsed dates) and writes <cache_dir>/<stem>.parquet plus
+    a <stem>.json sidecar with the source mtime, size, sha256, schema hash
+    and date parse failure counts (restored into df.attrs on cached reads).
+    Later reads are a memory-mapped Parquet read; the CSV is only re-parsed
+    when its content hash or its schema changes.
+    Without pyarrow this is a plain parse.
+    """
+    path = Path(path)
+    if not HAVE_PARQUET:
+        return read_source_csv(path, schema)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    data_file = cache_dir / f"{path.stem}.parquet"
+    meta_file = cache_dir / f"{path.stem}.json"
+
+    stat = path.stat()
+    source = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    meta = None
+    if data_file.exists() and meta_file.exists():
+        try:
+            meta = json.loads(meta_file.read_text())
+        except ValueError:
+            meta = None
+    if meta is not None and (
+        meta.get("version") != CACHE_VERSION or meta.get("schema") != schema_hash(schema)
+    ):
+        meta = None
+
+    if meta is not None:
+        fresh = meta["mtime_ns"] == source["mtime_ns"] and meta["size"] == source["size"]
+        if not fresh and meta["size"] == source["size"] and meta["sha256"] == file_sha256(path):
+            # touched but unchanged (e.g. git checkout): just refresh the sidecar
+            meta.update(source)
+            meta_file.write_text(json.dumps(meta))
+            fresh = True
+        if fresh:
+            df = pd.read_parquet(data_file, memory_map=True)
+            df.attrs["date_parse_failures"] = meta.get("date_parse_failures", {})
+            return df
+
+    sha256 = file_sha256(path)
+    df = read_source_csv(path, schema)
+    _write_atomic(df, data_file)
+    meta = {
+        "version": CACHE_VERSION,
+        "schema": schema_hash(schema),
+        "sha256": sha256,
+        "date_parse_failures": df.attrs.get("date_parse_failures", {}),
+        **source,
+    }
+    meta_file.write_text(json.dumps(meta))
+    return df
+
+
+def prime_cache(path: Path, df: pd.DataFrame, schema: dict, cache_dir: Path = CACHE_DIR):
+    """
+    Store an already typed frame as the cache entry of `path` (which must
+    hold exactly these rows, e.g. a CSV just rewritten by the data quality
+    step), so the next read_csv_cached does not parse the CSV again.
+    """
+    if not HAVE_PARQUET:
+        return
+    path = Path(path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    stat = path.stat()
+    _write_atomic(df, cache_dir / f"{path.stem}.parquet")
+    meta = {
+        "version": CACHE_VERSION,
+        "schema": schema_hash(schema),
+        "sha256": file_sha256(path),
+        "date_parse_failures": df.attrs.get("date_parse_failures", {}),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+    (cache_dir / f"{path.stem}.json").write_text(json.dumps(meta))
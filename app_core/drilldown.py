@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# ---- Trade-level drill-down behind the summary numbers ----
+# deals_4w is indexed once per data version (build_trade_index): row
+# positions per product subtype, the unconfirmed / unsettled masks and a
+# rank array per sortable column. query_trades then filters by position,
+# sorts the matching positions on the precomputed integer ranks and
+# materialises only the requested page, so the dashboard never ships (or
+# even copies) the full frame.
+
+DRILL_COLUMNS = [
+    "Trade_ID", "Product_subtype", "week", "Trade_date", "Value_date", "Settlement_date",
+    "Confirmation_flg", "Settlement_status", "Trade_capture_stp", "Settlement_stp", "deal_value_usd",
+]
+SORT_COLUMNS = ["Trade_date", "Value_date", "Settlement_date", "deal_value_usd", "Trade_ID"]
+STATUSES = ["Unconfirmed", "Unsettled", "All"]
+PAGE_SIZE = 50
+
+
+def _rank(values: pd.Series) -> np.ndarray:
+    """Position of each row in the column's ascending order (missing values last)."""
+    order = values.reset_index(drop=True).sort_values(kind="stable", na_position="last").index.to_numpy()
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+
+def build_trade_index(deals_4w: pd.DataFrame) -> dict:
+    """Everything query_trades needs, built once from run_analytics()["deals_4w"]."""
+    cols = [c for c in DRILL_COLUMNS if c in deals_4w.columns]
+    frame = deals_4w[cols].reset_index(drop=True)
+    if "week" in frame.columns:
+        frame = frame.assign(week=frame["week"].astype(str))
+    subtypes = frame["Product_subtype"].astype(str).to_numpy()
+    return {
+        "frame": frame,
+        "by_subtype": {sub: np.flatnonzero(subtypes == sub) for sub in np.unique(subtypes)},
+        "status": {
+            "Unconfirmed": deals_4w["Confirmation_flg"].eq("N").to_numpy(),
+            "Unsettled": deals_4w["_unsettled_bool"].astype(bool).to_numpy(),
+        },
+        "weeks": sorted(frame["week"].unique()) if "week" in frame.columns else [],
+        "ranks": {c: _rank(frame[c]) for c in SORT_COLUMNS if c in frame.columns},
+        "missing": {c: frame[c].isna().to_numpy() for c in SORT_COLUMNS if c in frame.columns},
+        "trade_ids": frame["Trade_ID"].astype(str).to_numpy(),
+    }
+
+
+def query_trades(index: dict, sub_product=None, status: str = "All", week=None, search: str = "",
+                 sort_by: str = "Trade_date", ascending: bool = True, page: int = 0,
+                 page_size: int = PAGE_SIZE):
+    """
+    One page of trades matching the filters, sorted on sort_by.
+    Returns (page_df, total) where total is the number of matching trades
+    (page_size=0 only counts).
+    """
+    frame = index["frame"]
+    if sub_product is None:
+        pos = np.arange(len(frame))
+    else:
+        pos = index["by_subtype"].get(sub_product, np.empty(0, dtype=np.int64))
+    if status != "All":
+        pos = pos[index["status"][status][pos]]
+    if week is not None:
+        pos = pos[frame["week"].to_numpy()[pos] == week]
+    if search:
+        ids = pd.Series(index["trade_ids"][pos])
+        pos = pos[ids.str.contains(search, case=False, regex=False).to_numpy()]
+
+    total = len(pos)
+    if page_size <= 0:  # count only
+        return frame.iloc[:0], total
+    if sort_by in index["ranks"]:
+        pos = pos[np.argsort(index["ranks"][sort_by][pos], kind="stable")]
+        if not ascending:  # missing values stay last
+            missing = index["missing"][sort_by][pos]
+            pos = np.concatenate([pos[~missing][::-1], pos[missing]])
+    start = max(page, 0) * page_size
+    return frame.iloc[pos[start:start + page_size]], total
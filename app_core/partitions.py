@@ -0,0 +1,131 @@
+from pathlib import Path
+import json
+import os
+import shutil
+import pandas as pd
+from app_core.schema import schema_for, empty_frame, concat_typed
+from app_core.data_cache import DATA_DIR
+from app_core.clean_area import CLEAN_DIR, clean_path
+
+# ---- Week-partitioned deal storage ----
+# Layout: data/deals/product=<key>/week=<monday YYYY-MM-DD>/part.parquet
+# (trade week = Trade_date bucketed W-SUN, same as analytics). When this
+# directory exists, load_data reads only the partitions of the report window
+# instead of every deal file, so load time no longer grows with history.
+# Rows without a Trade_date go to week=unknown and are never in a window.
+# The manifest records size/mtime stamps of the files the partitions were
+# built from (source CSV and clean-area Parquet); once any of them changes
+# the partitions are stale and load_data falls back to the sources until
+# they are rebuilt: agents/run_weekly_report.py refreshes them after its
+# data quality step, `python -m app_core.partitions` builds them by hand.
+
+PARTITION_DIR = DATA_DIR / "deals"
+MANIFEST_FILE = "_manifest.json"
+UNKNOWN_WEEK = "unknown"
+
+
+def _week_dir_name(week: pd.Period) -> str:
+    return f"week={week.start_time.strftime('%Y-%m-%d')}"
+
+
+def source_stamp(fname: str, data_dir: Path = DATA_DIR, clean_dir: Path = CLEAN_DIR) -> str:
+    """Size / mtime stamp of a source file and its clean-area Parquet (no content read)."""
+    parts = []
+    for path in (data_dir / fname, clean_path(fname, clean_dir)):
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        else:
+            parts.append("missing")
+    return ";".join(parts)
+
+
+def partitions_available(part_dir: Path = PARTITION_DIR) -> bool:
+    """True when the partitions exist and every file they were built from is unchanged."""
+    try:
+        manifest = json.loads((part_dir / MANIFEST_FILE).read_text())
+    except (OSError, ValueError):
+        return False
+    sources = manifest.get("sources")
+    return bool(sources) and all(source_stamp(fname) == stamp for fname, stamp in sources.items())
+
+
+def partition_weeks(part_dir: Path = PARTITION_DIR) -> list:
+    """Sorted trade weeks (W-SUN periods) present on disk; reads no data."""
+    weeks = set()
+    for product_dir in part_dir.glob("product=*"):
+        for week_dir in product_dir.glob("week=*"):
+            key = week_dir.name.split("=", 1)[1]
+            if key != UNKNOWN_WEEK:
+                weeks.add(pd.Period(key, freq="W-SUN"))
+    return sorted(weeks)
+
+
+def write_partitions(deal_frames: dict, sources: dict, part_dir: Path = PARTITION_DIR):
+    """
+    (Re)write the partitioned layout from typed deal frames
+    (load_data() output minus margin calls): one Parquet file per
+    product and trade week. A product's partitions are replaced as a whole.
+    sources: source file name -> source_stamp taken before the frames were
+    loaded (so a file replaced meanwhile makes the partitions stale).
+    """
+    part_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {"products": {}, "sources": dict(sources)}
+    for key, df in deal_frames.items():
+        product_dir = part_dir / f"product={key}"
+        tmp_dir = part_dir / f".product={key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        week = df["Trade_date"].dt.to_period("W-SUN")
+        for w, part in df.groupby(week, dropna=False, observed=True):
+            name = f"week={UNKNOWN_WEEK}" if pd.isna(w) else _week_dir_name(w)
+            (tmp_dir / name).mkdir(parents=True)
+            part.to_parquet(tmp_dir / name / "part.parquet", index=False)
+
+        shutil.rmtree(product_dir, ignore_errors=True)
+        os.replace(tmp_dir, product_dir)
+        manifest["products"][key] = len(df)
+
+    (part_dir / MANIFEST_FILE).write_text(json.dumps(manifest))
+
+
+def read_partitions(source_keys: dict, weeks, part_dir: Path = PARTITION_DIR) -> dict:
+    """
+    Read only the given trade weeks for each product.
+    source_keys: load_data key -> source file name (for the empty-frame schema).
+    Returns dict: key -> DataFrame.
+    """
+    wanted = [_week_dir_name(w) for w in weeks]
+    out = {}
+    for key, fname in source_keys.items():
+        files = [part_dir / f"product={key}" / name / "part.parquet" for name in wanted]
+        frames = [pd.read_parquet(f, memory_map=True) for f in files if f.exists()]
+        out[key] = concat_typed(frames) if frames else empty_frame(schema_for(fname))
+    return out
+
+
+def refresh_partitions(frames: dict = None, part_dir: Path = PARTITION_DIR) -> bool:
+    """
+    Rebuild the partitions if the layout has been set up (no-op otherwise),
+    e.g. after the data quality step rewrote the deal files. frames:
+    {source file name: typed frame} already in memory; the other deal files
+    are read. True when the partitions were rewritten.
+    """
+    if not (part_dir / MANIFEST_FILE).exists():
+        return False
+    from app_core.analytics import DEAL_KEYS, SOURCE_KEYS, raw_from_files
+
+    sources = {SOURCE_KEYS[k]: source_stamp(SOURCE_KEYS[k]) for k in DEAL_KEYS}
+    raw = raw_from_files(frames or {})
+    write_partitions({k: raw[k] for k in DEAL_KEYS}, sources, part_dir)
+    return True
+
+
+if __name__ == "__main__":
+    # python -m app_core.partitions  -> partition the data/ CSVs
+    from app_core.analytics import load_data, DEAL_KEYS, SOURCE_KEYS
+
+    sources = {SOURCE_KEYS[k]: source_stamp(SOURCE_KEYS[k]) for k in DEAL_KEYS}
+    raw = load_data()
+    write_partitions({k: raw[k] for k in DEAL_KEYS}, sources, PARTITION_DIR)
+    print(f"Wrote partitions for {len(DEAL_KEYS)} products under {PARTITION_DIR}")
@@ -0,0 +1,144 @@
+from pathlib import Path
+import hashlib
+import json
+import pandas as pd
+
+# ---- Per-file schema registry ----
+# For every source CSV: the only columns analytics/charts need, their dtypes,
+# and the date columns with their on-disk format. load_data reads just these
+# columns (usecols) with these dtypes instead of every column of wide files.
+
+DATE_FMT = "%d-%b-%Y"  # 03-Nov-2025
+
+FLAG = "category"  # Y/N flags, Settlement_type, Product_subtype
+
+_DEAL_COLUMNS = {
+    "Trade_ID": "str",
+    "Product_subtype": FLAG,
+    "Settlement_type": FLAG,
+    "Trade_capture_stp": FLAG,
+    "Confirmation_flg": FLAG,
+    "Settlement_stp": FLAG,
+    "Settlement_status": FLAG,
+}
+
+_DEAL_DATES = ["Trade_date", "Value_date", "Confirmation Date", "Settlement_date"]
+
+
+def _deal_schema(amount_cols, extra_dates=()):
+    columns = dict(_DEAL_COLUMNS)
+    columns.update({c: "float64" for c in amount_cols})
+    dates = {c: DATE_FMT for c in _DEAL_DATES + list(extra_dates)}
+    return {"columns": columns, "dates": dates}
+
+
+SOURCE_SCHEMAS = {
+    "df_equity.csv": _deal_schema(["Gross_amount_USD"]),
+    "df_fixedincome.csv": _deal_schema(["Gross_amount_USD"]),
+    "df_repos.csv": _deal_schema(["Cash_leg_amt_usd"], ["Return_leg_date"]),
+    "df_fxspot.csv": _deal_schema(["Base_amount_usd"]),
+    "df_derfx.csv": _deal_schema(
+        ["Base_amount_usd"],
+        ["Expiry_date", "Near_leg_date", "Far_leg_date", "Maturity_date_fut"],
+    ),
+    "df_dereq.csv": _deal_schema(
+        ["Contract_amount", "Notional"],
+        ["Expiry_date", "Near_leg_date", "Far_leg_date", "Maturity_date_fut"],
+    ),
+    "df_derint.csv": _deal_schema(
+        ["Notional"],
+        ["Expiry_date", "Near_leg_date", "Far_leg_date", "Maturity_date_fra"],
+    ),
+    "df_dercr.csv": _deal_schema(["Notional"]),
+    "df_margincalls.csv": {
+        "columns": {
+            "Call_ID": "str",
+            "Margin_type": "str",
+            "Call_amount": "float64",
+            "Call_result": "str",
+        },
+        "dates": {"Call_date": DATE_FMT},
+    },
+}
+
+
+def schema_for(fname: str) -> dict:
+    if fname not in SOURCE_SCHEMAS:
+        raise KeyError(f"No schema registered for source file {fname!r}")
+    return SOURCE_SCHEMAS[fname]
+
+
+def schema_hash(schema: dict) -> str:
+    """Stable hash of a schema entry (used to invalidate cached files)."""
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def normalize_dates(df: pd.DataFrame, dates: dict) -> dict:
+    """
+    Parse each date column once, in place, with its fixed format (no
+    per-element inference). Returns dict: column -> number of non-empty
+    values that failed to parse (they become NaT).
+    """
+    failures = {}
+    for col, fmt in dates.items():
+        if col not in df.columns:
+            continue
+        raw = df[col]
+        parsed = pd.to_datetime(raw, format=fmt, errors="coerce")
+        failures[col] = int((parsed.isna() & raw.notna()).sum())
+        df[col] = parsed
+    return failures
+
+
+def read_source_csv(path: Path, schema: dict) -> pd.DataFrame:
+    """
+    Read one source CSV projected to the schema columns, with explicit dtypes
+    and fixed-format date parsing. Date parse failure counts are kept in
+    df.attrs["date_parse_failures"].
+    """
+    columns = schema["columns"]
+    dates = schema["dates"]
+    df = pd.read_csv(path, usecols=list(columns) + list(dates), dtype=columns)
+    df.attrs["date_parse_failures"] = normalize_dates(df, dates)
+    return df
+
+
+def type_text_frame(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Project a frame read as text (dtype=str) to the schema columns and give
+    them the dtypes read_source_csv would, so already-read rows need no
+    second CSV parse. Date parse failure counts go to df.attrs.
+    """
+    columns = schema["columns"]
+    dates = schema["dates"]
+    out = df[[c for c in df.columns if c in columns or c in dates]].copy()
+    for col, dtype in columns.items():
+        if col in out.columns:
+            out[col] = pd.to_numeric(out[col], errors="coerce") if dtype == "float64" else out[col].astype(dtype)
+    out.attrs["date_parse_failures"] = normalize_dates(out, dates)
+    return out
+
+
+def empty_frame(schema: dict) -> pd.DataFrame:
+    """Zero-row frame with the schema's columns and dtypes."""
+    cols = {c: pd.Series(dtype=t) for c, t in schema["columns"].items()}
+    cols.update({c: pd.Series(dtype="datetime64[ns]") for c in schema["dates"]})
+    return pd.DataFrame(cols)
+
+
+def concat_typed(frames) -> pd.DataFrame:
+    """
+    pd.concat that keeps categorical columns categorical: per-file category
+    sets are unioned first (plain concat would fall back to object dtype).
+    """
+    frames = [df.copy(deep=False) for df in frames]  # don't touch the caller's frames
+    cat_cols = set()
+    for df in frames:
+        cat_cols.update(c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype))
+    for col in cat_cols:
+        if not all(col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) for df in frames):
+            continue
+        categories = sorted(set().union(*(df[col].cat.categories for df in frames)))
+        for df in frames:
+            df[col] = df[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
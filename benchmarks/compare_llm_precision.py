@@ -0,0 +1,120 @@
+"""
+Quality / latency comparison of the GEMMA_PRECISION modes on the weekly
+interpretation prompts (agents/prompts.py), filled from the metric digest of
+the current data/ week (agents/metric_digest.py).
+
+Each mode loads the model in its own spawned process and generates all
+chart interpretations as one batch. Reported per mode: load time,
+generation time, peak RSS, and how close its texts are to the float32
+texts (difflib ratio, 1.0 = identical), so a mode can be picked that fits
+the runner's memory without degrading the highlights.
+
+    python benchmarks/compare_llm_precision.py --out llm_precision.json
+    python benchmarks/compare_llm_precision.py --modes float32 int8 --max-new-tokens 64
+
+Needs the model weights (HF_TOKEN for gated Gemma models).
+"""
+from pathlib import Path
+import argparse
+import difflib
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _run_mode(precision: str, model_id: str, max_new_tokens: int, batch_size: int, queue):
+    sys.path[:0] = [str(BASE_DIR), str(BASE_DIR / "agents")]
+    try:
+        from langchain_core.prompts import PromptTemplate
+        from app_core.analytics import run_analytics
+        from gemma_llm import create_gemma_llm
+        from metric_digest import build_digest, prompt_inputs
+        from prompts import INTERPRETATION_TEMPLATE
+
+        prompts = prompt_inputs(build_digest(run_analytics()))
+
+        t0 = time.perf_counter()
+        llm = create_gemma_llm(model_id, max_new_tokens=max_new_tokens, batch_size=batch_size,
+                               precision=precision)
+        load_s = time.perf_counter() - t0
+
+        chain = PromptTemplate(input_variables=["chart_name", "period", "movers"],
+                               template=INTERPRETATION_TEMPLATE) | llm
+        t0 = time.perf_counter()
+        texts = chain.batch(list(prompts.values()))
+        generate_s = time.perf_counter() - t0
+
+        queue.put({
+            "precision": precision,
+            "load_s": load_s,
+            "generate_s": generate_s,
+            "peak_rss_mb": _peak_rss_mb(),
+            "texts": dict(zip(prompts, (t.strip() for t in texts))),
+        })
+    except Exception as exc:
+        queue.put({"precision": precision, "error": f"{type(exc).__name__}: {exc}"})
+
+
+def similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+
+
+def compare(modes, model_id: str, max_new_tokens: int, batch_size: int) -> list:
+    ctx = mp.get_context("spawn")
+    rows = []
+    for precision in modes:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_mode, args=(precision, model_id, max_new_tokens, batch_size, queue))
+        proc.start()
+        rows.append(queue.get())
+        proc.join()
+
+    reference = next((r for r in rows if r["precision"] == "float32" and "error" not in r), None)
+    for row in rows:
+        if "error" in row or reference is None:
+            continue
+        scores = [similarity(row["texts"][k], reference["texts"][k]) for k in reference["texts"]]
+        row["similarity_to_float32"] = sum(scores) / len(scores)
+    return rows
+
+
+def main():
+    sys.path.insert(0, str(BASE_DIR / "agents"))
+    from gemma_llm import MODEL_ID, MAX_NEW_TOKENS, BATCH_SIZE, PRECISIONS
+
+    parser = argparse.ArgumentParser(description="Compare Gemma CPU precision modes")
+    parser.add_argument("--modes", nargs="+", choices=PRECISIONS, default=list(PRECISIONS))
+    parser.add_argument("--model-id", default=MODEL_ID)
+    parser.add_argument("--max-new-tokens", type=int, default=MAX_NEW_TOKENS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--out", type=Path, help="write results (incl. texts) as JSON")
+    args = parser.parse_args()
+
+    modes = args.modes if "float32" in args.modes else ["float32", *args.modes]  # reference
+    rows = compare(modes, args.model_id, args.max_new_tokens, args.batch_size)
+
+    print(f"model {args.model_id}, max_new_tokens={args.max_new_tokens}, batch_size={args.batch_size}, "
+          f"cpus={os.cpu_count()}")
+    for row in rows:
+        if "error" in row:
+            print(f"{row['precision']:9s} FAILED  {row['error']}")
+            continue
+        sim = row.get("similarity_to_float32")
+        print(f"{row['precision']:9s} load {row['load_s']:7.1f}s  generate {row['generate_s']:7.1f}s  "
+              f"peak RSS {row['peak_rss_mb']:8.0f} MB  similarity {sim if sim is not None else float('nan'):.2f}")
+    if args.out:
+        args.out.write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Benchmark harness for the analytics / chart / data quality pipeline.
+
+Each stage runs in a fresh spawned process, so its peak RSS is its own and
+not a leftover of an earlier stage. Inputs a stage needs (e.g. the results
+of run_analytics for the plot_* stages) are built in that process before
+the clock starts. Per stage we report the best and median wall time over
+--repeat runs, the peak RSS of the process and how much the timed part
+added to it.
+
+    python benchmarks/run_benchmarks.py                          # data/
+    python benchmarks/run_benchmarks.py --data-dir data_1m --out bench_1m.json
+    python benchmarks/run_benchmarks.py --cold                   # drop parse caches first
+
+Use datagen/scale_data.py to produce the 1M / 10M / 50M-row datasets.
+run_data_quality rewrites the files it checks, so it runs on a scratch copy
+of the data directory and its e-mail is not sent.
+"""
+from pathlib import Path
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+SOURCE_FILES = [
+    "df_equity.csv", "df_fixedincome.csv", "df_repos.csv", "df_fxspot.csv",
+    "df_derfx.csv", "df_dereq.csv", "df_derint.csv", "df_dercr.csv", "df_margincalls.csv",
+]
+
+# plot function -> (module, run_analytics result keys passed as arguments)
+PLOTS = {
+    "plot_deal_volumes": ("app_core.charts.num_deals_chart", ["group_metrics"]),
+    "plot_deal_value": ("app_core.charts.val_deals_chart", ["group_metrics"]),
+    "plot_trade_cap_stp": ("app_core.charts.trade_cap_stp_chart", ["group_metrics"]),
+    "plot_settlement_stp": ("app_core.charts.settlement_stp_chart", ["group_metrics"]),
+    "plot_deals_unconfirmed": ("app_core.charts.unconfirmed_deals_chart", ["group_metrics"]),
+    "plot_deals_unsettled": ("app_core.charts.unsettled_deals_chart", ["group_metrics"]),
+    "plot_disputed_margin_calls": ("app_core.charts.disputed_margin_calls_chart", ["df_margincalls"]),
+}
+
+STAGES = ["load_data", "run_analytics", *PLOTS, "render_charts", "summary_tables", "run_data_quality"]
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _drop_caches(data_dir: Path):
+    shutil.rmtree(data_dir / ".cache", ignore_errors=True)
+
+
+# ---- stage setup: returns (untimed per-run prepare step or None, callable to time) ----
+def _setup(stage: str, data_dir: Path, cold: bool):
+    sys.path.insert(0, str(BASE_DIR))
+    if stage == "run_data_quality":
+        sys.path.insert(0, str(BASE_DIR / "agents"))
+        os.environ.setdefault("SMTP_PORT", "587")
+        import data_quality_agent
+        data_quality_agent.send_email = lambda subject, body: None  # not part of the benchmark
+        scratch = Path(os.environ["IB_DATA_DIR"])
+
+        def prepare():
+            for fname in SOURCE_FILES:  # fresh copy: the check overwrites accepted rows
+                shutil.copy(data_dir / fname, scratch / fname)
+        return prepare, lambda: data_quality_agent.run_data_quality(SOURCE_FILES)
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from app_core import analytics
+
+    if stage in ("load_data", "run_analytics"):
+        fn = analytics.load_data if stage == "load_data" else analytics.run_analytics
+        return ((lambda: _drop_caches(data_dir)) if cold else None), fn
+
+    workers = int(os.environ.get("CHART_WORKERS", os.cpu_count() or 1))
+    if stage == "render_charts":  # all charts to PNG, process pool (CHART_WORKERS)
+        from app_core.charts.render import render_charts
+        results = analytics.run_analytics()
+        out_dir = Path(tempfile.mkdtemp())
+        return None, lambda: render_charts(results, out_dir, workers=workers)
+    if stage == "summary_tables":  # every subtype table -> one PDF
+        from app_core.charts.summary_tables import render_summary_pdf
+        cube = analytics.run_analytics()["metrics_cube"]
+        out_path = Path(tempfile.mkdtemp()) / "summary_tables.pdf"
+        return None, lambda: render_summary_pdf(cube, out_path, workers=workers)
+
+    module_name, keys = PLOTS[stage]
+    plot = getattr(__import__(module_name, fromlist=[stage]), stage)
+    results = analytics.run_analytics()
+    args = [results[k] for k in keys]
+
+    def run():
+        out = plot(*args)
+        plt.close("all")
+        return out
+    return None, run
+
+
+def _run_stage(stage: str, data_dir: str, repeat: int, cold: bool, queue):
+    data_dir = Path(data_dir)
+    try:
+        prepare, fn = _setup(stage, data_dir, cold)
+        rss_before = _peak_rss_mb()
+        times = []
+        for _ in range(repeat):
+            if prepare is not None:
+                prepare()
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        rss_peak = _peak_rss_mb()
+        queue.put({
+            "stage": stage,
+            "best_s": min(times),
+            "median_s": statistics.median(times),
+            "peak_rss_mb": rss_peak,
+            "stage_rss_mb": rss_peak - rss_before,
+        })
+    except Exception as exc:  # report and keep going with the other stages
+        queue.put({"stage": stage, "error": f"{type(exc).__name__}: {exc}"})
+
+
+def run_benchmarks(data_dir: Path, stages=STAGES, repeat: int = 3, cold: bool = False) -> list:
+    data_dir = Path(data_dir).resolve()
+    ctx = mp.get_context("spawn")
+    rows = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for stage in stages:
+            # the DQ stage works on a scratch copy; everything else reads data_dir
+            os.environ["IB_DATA_DIR"] = scratch if stage == "run_data_quality" else str(data_dir)
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run_stage, args=(stage, str(data_dir), repeat, cold, queue))
+            proc.start()
+            row = queue.get()
+            proc.join()
+            rows.append(row)
+            if "error" in row:
+                print(f"{stage:28s} FAILED  {row['error']}")
+            else:
+                print(f"{stage:28s} best {row['best_s']:8.3f}s  median {row['median_s']:8.3f}s  "
+                      f"peak RSS {row['peak_rss_mb']:8.1f} MB  (+{row['stage_rss_mb']:.1f} MB)")
+    return rows
+
+
+def _dataset_rows(data_dir: Path) -> int:
+    total = 0
+    for fname in SOURCE_FILES:
+        with open(data_dir / fname, "rb") as f:
+            total += sum(1 for _ in f) - 1
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the analytics pipeline stages")
+    parser.add_argument("--data-dir", type=Path, default=BASE_DIR / "data")
+    parser.add_argument("--stage", action="append", choices=STAGES, help="run only these stages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cold", action="store_true", help="drop the Parquet caches before each load")
+    parser.add_argument("--out", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    n_rows = _dataset_rows(args.data_dir)
+    print(f"dataset: {args.data_dir} ({n_rows:,} rows), repeat={args.repeat}, cold={args.cold}")
+    rows = run_benchmarks(args.data_dir, args.stage or STAGES, args.repeat, args.cold)
+
+    if args.out:
+        report = {
+            "data_dir": str(args.data_dir),
+            "rows": n_rows,
+            "repeat": args.repeat,
+            "cold": args.cold,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "stages": rows,
+        }
+        args.out.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
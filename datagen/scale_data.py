@@ -0,0 +1,132 @@
+"""
+Scale the synthetic dataset in data/ up to a target row count, for benchmarks.
+
+Rows of every df_*.csv are bootstrapped (sampled with replacement) from the
+seed files, so each output file keeps its source's columns, dtypes, date
+formats and Y/N flag mix, and the per-file share of the total is preserved.
+Per generated row:
+  * Trade_ID / Call_ID are reissued so they stay unique
+  * amount columns are scaled by one lognormal factor (mean ~1)
+  * Trading_Desk_ID is redrawn from the TD sheet of RefData.xlsx
+    (skipped when the workbook or openpyxl is not available)
+Trade dates are kept, so the weekly windows look like the seed data.
+
+Files are written in chunks, so 50M rows do not need to fit in memory:
+
+    python datagen/scale_data.py --rows 1000000 --out data_1m
+    python datagen/scale_data.py --rows 50000000 --out /mnt/bench/data_50m
+
+Point the app / benchmarks at the result with IB_DATA_DIR=<out>.
+"""
+from pathlib import Path
+import argparse
+import shutil
+import sys
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from app_core.schema import SOURCE_SCHEMAS  # noqa: E402
+
+SEED_DIR = BASE_DIR / "data"
+REFDATA = BASE_DIR / "datagen" / "RefData.xlsx"
+
+ID_COLUMN = {fname: ("Call_ID" if fname == "df_margincalls.csv" else "Trade_ID") for fname in SOURCE_SCHEMAS}
+
+# amount columns scaled together per row (only those present in a file are used)
+AMOUNT_COLUMNS = [
+    "Gross_amount", "Gross_amount_USD", "Net_amount", "Fees_commission",
+    "Cash_leg_amt_local", "Cash_leg_amt_usd", "Return_leg_amt_local", "Return_leg_amt_usd",
+    "Collateral_value", "Base_amount", "Quote_amount", "Base_amount_usd",
+    "Near_leg_amount", "Far_leg_amount", "Contract_amount", "Notional", "Premium",
+    "Initial Margin", "Variation_Margin", "Call_amount",
+]
+
+
+def load_trading_desks(path: Path = REFDATA) -> list:
+    """Trading desk names from RefData.xlsx (sheet TD), or [] if unreadable."""
+    try:
+        td = pd.read_excel(path, sheet_name="TD")
+    except (ImportError, OSError, ValueError) as exc:
+        print(f"RefData not used ({exc}); keeping seed Trading_Desk_ID values")
+        return []
+    return td["TradinDeskName"].dropna().astype(str).str.strip().tolist()
+
+
+def _id_prefix(ids: pd.Series) -> str:
+    """'EQT0001' -> 'EQT' (letters in front of the running number)."""
+    first = str(ids.dropna().iloc[0]) if ids.notna().any() else "ID"
+    return first.rstrip("0123456789") or "ID"
+
+
+def scale_file(seed: pd.DataFrame, fname: str, n_rows: int, out_path: Path,
+               rng: np.random.Generator, desks: list, chunk_rows: int):
+    id_col = ID_COLUMN[fname]
+    prefix = _id_prefix(seed[id_col]) if id_col in seed.columns else None
+    width = max(7, len(str(n_rows)))
+    amounts = [c for c in AMOUNT_COLUMNS if c in seed.columns]
+
+    written = 0
+    with open(out_path, "w", newline="") as f:
+        while written < n_rows:
+            n = min(chunk_rows, n_rows - written)
+            chunk = seed.iloc[rng.integers(0, len(seed), size=n)].reset_index(drop=True)
+            if prefix is not None:
+                chunk[id_col] = [f"{prefix}{i:0{width}d}" for i in range(written + 1, written + n + 1)]
+            if amounts:
+                factor = rng.lognormal(mean=-0.045, sigma=0.3, size=n)  # E[factor] ~ 1
+                for col in amounts:
+                    chunk[col] = (pd.to_numeric(chunk[col], errors="coerce") * factor).round(2)
+            if desks and "Trading_Desk_ID" in chunk.columns:
+                chunk["Trading_Desk_ID"] = rng.choice(desks, size=n)
+            chunk.to_csv(f, header=(written == 0), index=False)
+            written += n
+    return written
+
+
+def scale_dataset(total_rows: int, out_dir: Path, seed_dir: Path = SEED_DIR, seed: int = 42,
+                  chunk_rows: int = 500_000, use_refdata: bool = True) -> dict:
+    """
+    Write ~total_rows rows spread over the nine source files (same proportions
+    as seed_dir) into out_dir. Returns dict: file name -> rows written.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    desks = load_trading_desks() if use_refdata else []
+
+    # read everything as text: values are written back exactly as in the seed
+    seeds = {
+        fname: pd.read_csv(seed_dir / fname, dtype=str, keep_default_na=False, na_values=[""])
+        for fname in SOURCE_SCHEMAS
+    }
+    seed_total = sum(len(df) for df in seeds.values())
+
+    counts = {}
+    for fname, df in seeds.items():
+        n_rows = max(1, round(total_rows * len(df) / seed_total))
+        counts[fname] = scale_file(df, fname, n_rows, out_dir / fname, rng, desks, chunk_rows)
+        print(f"{fname}: {counts[fname]:,} rows")
+
+    highlights = seed_dir / "weekly_highlights.txt"
+    if highlights.exists():
+        shutil.copy(highlights, out_dir / highlights.name)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scale the synthetic IB dataset for benchmarks")
+    parser.add_argument("--rows", type=int, required=True, help="total rows over all files, e.g. 1000000")
+    parser.add_argument("--out", type=Path, required=True, help="output directory")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    parser.add_argument("--no-refdata", action="store_true", help="do not use RefData.xlsx")
+    args = parser.parse_args()
+    counts = scale_dataset(args.rows, args.out, seed=args.seed, chunk_rows=args.chunk_rows,
+                           use_refdata=not args.no_refdata)
+    print(f"total: {sum(counts.values()):,} rows in {args.out}")
+
+
+if __name__ == "__main__":
+    main()